@@ -1,33 +1,149 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
+import json
+import time
+import logging
+
+import llm
+from response_cache import ResponseCache, normalize_prompt
+from coalescing import SingleFlight, MicroBatcher
 
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
+logger = logging.getLogger(__name__)
+
 # Initialize Gemini LLM
 # TODO: Initialize Langchain with Gemini
 
+# Cache of replies keyed by normalized prompt (set RESPONSE_CACHE_PATH to persist to disk)
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '1024')),
+    ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', '3600')),
+    disk_path=os.getenv('RESPONSE_CACHE_PATH') or None
+)
+
+# Identical in-flight prompts share one generation; distinct prompts arriving
+# within CHAT_BATCH_WINDOW_MS of each other go to the model as one batch
+in_flight = SingleFlight()
+batcher = MicroBatcher(
+    llm.generate_batch,
+    batch_window_ms=float(os.getenv('CHAT_BATCH_WINDOW_MS', '5')),
+    max_batch_size=int(os.getenv('CHAT_BATCH_MAX_SIZE', '8'))
+)
+
+def generate_coalesced(user_message):
+    """Generate a reply through the single-flight and micro-batching layers"""
+    return in_flight.do(
+        normalize_prompt(user_message),
+        lambda: batcher.submit(user_message).result()
+    )
+
+def sse_event(event, payload):
+    """Format a single Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def stream_reply(user_message):
+    """
+    Yield SSE frames for a reply as chunks are produced.
+    If the client disconnects the server closes this generator, which
+    closes the upstream token stream and stops generation.
+    """
+    started = time.perf_counter()
+    ttft_ms = None
+    chunks = []
+    finished = False
+    cached = response_cache.get(user_message)
+    tokens = iter([cached]) if cached is not None else llm.stream_chat(user_message)
+    try:
+        for chunk in tokens:
+            if ttft_ms is None:
+                ttft_ms = round((time.perf_counter() - started) * 1000, 1)
+                yield sse_event('meta', {"ttft_ms": ttft_ms, "cached": cached is not None})
+            chunks.append(chunk)
+            yield sse_event('token', {"text": chunk})
+        finished = True
+        if cached is None:
+            response_cache.put(user_message, ''.join(chunks))
+        yield sse_event('done', {
+            "ttft_ms": ttft_ms,
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            "chunks": len(chunks),
+            "cached": cached is not None
+        })
+    except Exception as e:
+        finished = True
+        yield sse_event('error', {"error": str(e)})
+    finally:
+        if hasattr(tokens, 'close'):
+            tokens.close()
+        if not finished:
+            logger.info("Client disconnected, cancelled generation after %d chunks", len(chunks))
+
+def wants_event_stream():
+    """True if the client negotiated a Server-Sent Events response"""
+    return request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream'
+
+def event_stream_response(user_message):
+    return Response(
+        stream_with_context(stream_reply(user_message)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """
     Handle chat requests
     Expected JSON: {"message": "user message"}
+    Send "Accept: text/event-stream" to receive the reply as a stream
     """
     try:
         data = request.json
         user_message = data.get('message', '')
         
+        if wants_event_stream():
+            return event_stream_response(user_message)
+        
         # TODO: Process message with Langchain + Gemini
         # response = chain.run(user_message)
+        response = response_cache.get_or_compute(user_message, generate_coalesced)
         
-        return jsonify({"response": "Response from Gemini"})
+        return jsonify({"response": response})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Stream chat replies as Server-Sent Events
+    Expected JSON: {"message": "user message"}
+    Events: meta (ttft_ms), token (text), done (ttft_ms, total_ms, chunks), error
+    """
+    try:
+        data = request.json
+        user_message = data.get('message', '')
+        return event_stream_response(user_message)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Response cache hit/miss counters"""
+    return jsonify(response_cache.stats())
+
+@app.route('/api/batching/stats', methods=['GET'])
+def batching_stats():
+    """Request coalescing and micro-batching counters"""
+    return jsonify({
+        "single_flight": in_flight.stats(),
+        "batcher": batcher.stats()
+    })
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({"status": "ok"})
@@ -0,0 +1,50 @@
+"""
+Offline benchmark: throughput of concurrent /api/chat requests with and
+without single-flight + micro-batching, against the fake slow backend.
+The response cache is cleared before each run so every prompt misses it.
+
+Run: python bench_coalesce.py [clients] [requests_per_client]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app as chat_app
+import llm
+
+PROMPTS = ["Hello, how are you?", "What can you do?", "Tell me about AI"]
+
+
+def run(clients, per_client, unique):
+    chat_app.response_cache.clear()
+    client = chat_app.app.test_client()
+
+    def worker(worker_id):
+        for i in range(per_client):
+            if unique:
+                message = f"question {worker_id}-{i}"
+            else:
+                message = PROMPTS[i % len(PROMPTS)]
+            client.post('/api/chat', json={'message': message})
+            chat_app.response_cache.clear()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(worker, range(clients)))
+    return clients * per_client / (time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    coalesced = chat_app.generate_coalesced
+    for unique in (False, True):
+        label = 'distinct prompts' if unique else 'identical prompts'
+        chat_app.generate_coalesced = llm.generate
+        baseline = run(clients, per_client, unique)
+        chat_app.generate_coalesced = coalesced
+        batched = run(clients, per_client, unique)
+        print(f"{label:18} direct: {baseline:7.1f} req/s   coalesced: {batched:7.1f} req/s   "
+              f"({batched / baseline:.1f}x)")
+    print(chat_app.batcher.stats())
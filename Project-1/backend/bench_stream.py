@@ -0,0 +1,50 @@
+"""
+Offline benchmark: time-to-first-token of /api/chat/stream vs /api/chat.
+Uses the fake generator in llm.py, so no API key or network is needed.
+The response cache is cleared before every request.
+
+Run: python bench_stream.py [requests]
+"""
+import sys
+import time
+import statistics
+
+from app import app, response_cache
+
+PROMPTS = ["Hello, how are you?", "What can you do?", "Tell me about AI"]
+
+
+def time_blocking(client, message):
+    response_cache.clear()
+    started = time.perf_counter()
+    client.post('/api/chat', json={'message': message}).get_json()
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+def time_streaming(client, message):
+    response_cache.clear()
+    started = time.perf_counter()
+    response = client.post('/api/chat/stream', json={'message': message}, buffered=False)
+    ttft = None
+    for frame in response.response:
+        if ttft is None and b'event: token' in frame:
+            ttft = time.perf_counter() - started
+    response.close()
+    return ttft, time.perf_counter() - started
+
+
+def report(name, samples):
+    ttfts = [s[0] * 1000 for s in samples]
+    totals = [s[1] * 1000 for s in samples]
+    print(f"{name:10} first byte of reply: median {statistics.median(ttfts):7.1f} ms   "
+          f"full reply: median {statistics.median(totals):7.1f} ms")
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 9
+    client = app.test_client()
+    blocking = [time_blocking(client, PROMPTS[i % len(PROMPTS)]) for i in range(n)]
+    streaming = [time_streaming(client, PROMPTS[i % len(PROMPTS)]) for i in range(n)]
+    report('blocking', blocking)
+    report('streaming', streaming)
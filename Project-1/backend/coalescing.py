@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one computation:
+    the first caller runs it, everyone else waits for that result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # {key: Future}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'followers': self.followers
+            }
+
+
+class MicroBatcher:
+    """
+    Gather items submitted within batch_window_ms of each other (up to
+    max_batch_size) and hand them to batch_fn(items) -> results in one call.
+    """
+
+    def __init__(self, batch_fn, batch_window_ms=5, max_batch_size=8, max_concurrent_batches=4):
+        self.batch_fn = batch_fn
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_batches)
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def submit(self, item):
+        """Queue an item; returns a Future for its result"""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._execute, batch)
+
+    def _execute(self, batch):
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = list(self.batch_fn([item for item, _ in batch]))
+            if len(results) != len(batch):
+                raise ValueError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'batch_window_ms': self.batch_window * 1000,
+                'max_batch_size': self.max_batch_size,
+                'queued': self._queue.qsize(),
+                'batches': self.batches,
+                'items': self.items,
+                'largest_batch': self.largest_batch,
+                'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0
+            }
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+# Simulated latency for the fake generator (seconds)
+FAKE_FIRST_TOKEN_DELAY = float(os.getenv('FAKE_LLM_FIRST_TOKEN_DELAY', '0.3'))
+FAKE_TOKEN_DELAY = float(os.getenv('FAKE_LLM_TOKEN_DELAY', '0.03'))
+# Like a real model endpoint, the fake backend serves a limited number of calls at once
+FAKE_CONCURRENCY = int(os.getenv('FAKE_LLM_CONCURRENCY', '4'))
+_backend_slots = threading.BoundedSemaphore(FAKE_CONCURRENCY)
+
+# Canned replies for the demo prompts in PROJECTS_DEMO_GUIDE.md
+FAKE_REPLIES = {
+    'hello': "Hello! I'm doing well, thanks for asking. How can I help you today?",
+    'ai': ("Artificial Intelligence is a fascinating field that encompasses machine learning, "
+           "deep learning, and natural language processing. AI systems can process large amounts "
+           "of data and learn patterns to make intelligent decisions."),
+    'can you do': "I can answer questions, explain concepts and help you brainstorm ideas.",
+}
+
+
+def fake_reply(user_message):
+    """Pick a canned reply for a message"""
+    message_lower = user_message.lower()
+    for keyword, reply in FAKE_REPLIES.items():
+        if keyword in message_lower:
+            return reply
+    return f"Response from Gemini to: {user_message}"
+
+
+def fake_stream(user_message, first_token_delay=None, token_delay=None):
+    """
+    Offline stand-in for a streaming LLM: yields the reply word by word
+    with a simulated time-to-first-token and inter-token delay.
+    """
+    if first_token_delay is None:
+        first_token_delay = FAKE_FIRST_TOKEN_DELAY
+    if token_delay is None:
+        token_delay = FAKE_TOKEN_DELAY
+
+    words = fake_reply(user_message).split(' ')
+    with _backend_slots:
+        time.sleep(first_token_delay)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(token_delay)
+            yield word if i == 0 else ' ' + word
+
+
+def fake_generate_batch(user_messages, first_token_delay=None, token_delay=None):
+    """
+    Offline stand-in for a batched LLM call: one round trip whose latency
+    is set by the longest reply, however many prompts are in the batch.
+    """
+    if first_token_delay is None:
+        first_token_delay = FAKE_FIRST_TOKEN_DELAY
+    if token_delay is None:
+        token_delay = FAKE_TOKEN_DELAY
+
+    replies = [fake_reply(m) for m in user_messages]
+    longest = max(len(r.split(' ')) for r in replies)
+    with _backend_slots:
+        time.sleep(first_token_delay + token_delay * (longest - 1))
+    return replies
+
+
+def stream_chat(user_message):
+    """
+    Stream reply chunks for a message.
+    TODO: Replace with Langchain + Gemini streaming, e.g.
+    for chunk in chain.stream(user_message): yield chunk
+    """
+    return fake_stream(user_message)
+
+
+def generate(user_message):
+    """Produce the full reply for a message"""
+    return ''.join(stream_chat(user_message))
+
+
+def generate_batch(user_messages):
+    """
+    Produce replies for several messages in one backend call.
+    TODO: Replace with Langchain + Gemini, e.g. chain.batch(user_messages)
+    """
+    return fake_generate_batch(user_messages)
@@ -0,0 +1,141 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(text):
+    """
+    Build the cache key for a prompt: case, whitespace and punctuation
+    differences are ignored, so "Hello, how are you?" and
+    "hello how are you" share an entry.
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class ResponseCache:
+    """
+    Bounded LRU + TTL cache of LLM replies keyed by normalized prompt,
+    with an optional SQLite tier on disk that survives restarts.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, disk_path=None, max_disk_entries=100000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()  # {key: (stored_at, response)}
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, response TEXT NOT NULL, stored_at REAL NOT NULL)'
+            )
+            self._disk.execute('CREATE INDEX IF NOT EXISTS idx_responses_stored_at ON responses (stored_at)')
+            self._disk.commit()
+
+    def _expired(self, stored_at, now):
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def get(self, prompt):
+        """Return the cached reply for a prompt, or None"""
+        key = normalize_prompt(prompt)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    'SELECT stored_at, response FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[0], now):
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[1]
+
+            self.misses += 1
+            return None
+
+    def put(self, prompt, response):
+        """Cache the reply for a prompt"""
+        key = normalize_prompt(prompt)
+        now = time.time()
+        with self._lock:
+            self._store(key, now, response)
+            if self._disk is not None:
+                self._disk.execute(
+                    'INSERT OR REPLACE INTO responses (key, response, stored_at) VALUES (?, ?, ?)',
+                    (key, response, now)
+                )
+                self._disk.commit()
+                self._disk_writes += 1
+                if self._disk_writes % 100 == 0:
+                    self._prune_disk(now)
+
+    def get_or_compute(self, prompt, compute):
+        """Return the cached reply, calling compute(prompt) on a miss"""
+        response = self.get(prompt)
+        if response is None:
+            response = compute(prompt)
+            self.put(prompt, response)
+        return response
+
+    def _store(self, key, stored_at, response):
+        self._entries[key] = (stored_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self, now):
+        if self.ttl_seconds is not None:
+            self._disk.execute('DELETE FROM responses WHERE stored_at < ?', (now - self.ttl_seconds,))
+        self._disk.execute(
+            'DELETE FROM responses WHERE key IN ('
+            'SELECT key FROM responses ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_disk_entries,)
+        )
+        self._disk.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute('DELETE FROM responses')
+                self._disk.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'disk_enabled': self._disk is not None,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
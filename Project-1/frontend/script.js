@@ -1,5 +1,8 @@
 const API_URL = 'http://localhost:5000/api';
 
+// Aborting this cancels the in-flight stream (and generation on the server)
+let activeStream = null;
+
 async function sendMessage() {
     const userInput = document.getElementById('userInput');
     const message = userInput.value.trim();
@@ -10,19 +13,71 @@ async function sendMessage() {
     displayMessage(message, 'user');
     userInput.value = '';
     
+    if (activeStream) activeStream.abort();
+    const controller = new AbortController();
+    activeStream = controller;
+    const botDiv = displayMessage('', 'bot');
+    
     try {
-        // Send to backend
-        const response = await fetch(`${API_URL}/chat`, {
+        // Send to backend and render tokens as they arrive
+        const response = await fetch(`${API_URL}/chat/stream`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ message })
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify({ message }),
+            signal: controller.signal
         });
         
-        const data = await response.json();
-        displayMessage(data.response || data.error, 'bot');
+        if (!response.ok || !response.body) {
+            const data = await response.json();
+            botDiv.textContent = data.response || data.error;
+            return;
+        }
+        
+        await readEventStream(response.body, (event, data) => {
+            if (event === 'token') {
+                appendToMessage(botDiv, data.text);
+            } else if (event === 'done') {
+                console.log(`TTFT ${data.ttft_ms}ms, total ${data.total_ms}ms`);
+            } else if (event === 'error') {
+                botDiv.textContent = data.error;
+            }
+        });
     } catch (error) {
-        displayMessage('Error connecting to server', 'bot');
+        if (error.name === 'AbortError') return;
+        botDiv.textContent = 'Error connecting to server';
         console.error('Error:', error);
+    } finally {
+        if (activeStream === controller) activeStream = null;
+    }
+}
+
+async function readEventStream(body, onEvent) {
+    // Minimal SSE parser: frames are separated by a blank line
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            if (data) onEvent(event, JSON.parse(data));
+        }
     }
 }
 
@@ -33,6 +88,13 @@ function displayMessage(text, sender) {
     messageDiv.textContent = text;
     messagesDiv.appendChild(messageDiv);
     messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    return messageDiv;
+}
+
+function appendToMessage(messageDiv, text) {
+    const messagesDiv = document.getElementById('messages');
+    messageDiv.textContent += text;
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
 }
 
 function handleKeyPress(event) {
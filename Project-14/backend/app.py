@@ -2,6 +2,8 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
 
+from ids import new_id
+
 app = Flask(__name__)
 CORS(app)
 
@@ -42,7 +44,7 @@ def execute_workflow(workflow_id, input_data):
     
     workflow = WORKFLOWS[workflow_id]
     execution = {
-        'id': f'exec_{len(EXECUTIONS) + 1}',
+        'id': f'exec_{new_id()}',
         'workflow': workflow_id,
         'status': 'success',
         'started_at': datetime.now().isoformat(),
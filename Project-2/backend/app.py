@@ -2,18 +2,29 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
+import base64
+import hashlib
 from datetime import datetime
 
+from storage import ChatStore
+
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
-# In-memory storage for demo (replace with database in production)
-users = {}
-chat_messages = {}
+# SQLite (WAL) database for users and chat history
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'chat_history.db')
+
+# Chat history page size
+DEFAULT_HISTORY_LIMIT = 50
+MAX_HISTORY_LIMIT = 500
 
-# Models (using in-memory storage)
+def now_str():
+    """UTC timestamp with fixed precision, so stored values sort correctly"""
+    return datetime.utcnow().isoformat(sep=' ', timespec='microseconds')
+
+# Models
 class ChatMessage:
     def __init__(self, user_id, message, response):
         self.user_id = user_id
@@ -29,7 +40,17 @@ class User:
         self.created_at = datetime.utcnow()
 
 # Create tables
-# Base.metadata.create_all(engine)
+store = ChatStore(DATABASE_PATH)
+
+def encode_cursor(chat):
+    """Opaque pagination cursor for a message's (created_at, id) position"""
+    raw = f"{chat['created_at']}|{chat['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, chat_id = base64.urlsafe_b64decode(padded).decode().rsplit('|', 1)
+    return created_at, int(chat_id)
 
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -45,27 +66,59 @@ def login():
         # For demo, accept any email
         user_id = email.replace('@', '_').replace('.', '_')
         
-        if user_id not in users:
-            users[user_id] = {
-                'email': email,
-                'name': email.split('@')[0],
-                'created_at': str(datetime.utcnow())
-            }
-            chat_messages[user_id] = []
+        user = store.get_user(user_id)
+        if user is None:
+            user = store.get_or_create_user(user_id, email, email.split('@')[0], now_str())
         
-        return jsonify({"status": "logged_in", "user_id": user_id, "name": users[user_id]['name']})
+        return jsonify({"status": "logged_in", "user_id": user_id, "name": user['name']})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/chat-history/<user_id>', methods=['GET'])
 def get_chat_history(user_id):
-    """Get all chats for a user from database"""
+    """
+    Get a page of chats for a user from database
+    Query params:
+      limit  - page size (default 50, max 500)
+      before - cursor from a previous page's next_cursor, to load older chats
+      since  - created_at timestamp, to load only chats newer than it
+    Responses carry an ETag; If-None-Match with an unchanged page returns 304.
+    """
     try:
-        chats = chat_messages.get(user_id, [])
+        try:
+            limit = int(request.args.get('limit', DEFAULT_HISTORY_LIMIT))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, MAX_HISTORY_LIMIT))
+        before = request.args.get('before')
+        since = request.args.get('since')
+        
+        if since is not None:
+            chats, has_more = store.get_messages_since(user_id, since, limit)
+            result = {
+                "chats": chats,
+                "has_more": has_more,
+                "latest": chats[-1]['created_at'] if chats else since
+            }
+        else:
+            try:
+                cursor = decode_cursor(before) if before else None
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({"error": "Invalid cursor"}), 400
+            chats, has_more = store.get_messages_page(user_id, limit, cursor)
+            result = {
+                "chats": chats,
+                "has_more": has_more,
+                "next_cursor": encode_cursor(chats[0]) if has_more else None,
+                "latest": chats[-1]['created_at'] if chats else None
+            }
         
-        return jsonify({
-            "chats": chats
-        })
+        # History is append-only, so a page is identified by its query and the ids it holds
+        page_key = f"{user_id}|{request.query_string.decode()}|{[c['id'] for c in chats]}|{has_more}"
+        response = jsonify(result)
+        response.set_etag(hashlib.sha1(page_key.encode()).hexdigest())
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -76,19 +129,14 @@ def chat():
         data = request.json
         user_id = data.get('user_id')
         message = data.get('message', '')
-        
+        if not user_id:
+            return jsonify({"error": "user_id is required"}), 400
+
         # TODO: Process with Gemini
         response = f"Bot response to: {message}"
         
-        # Store in memory
-        if user_id not in chat_messages:
-            chat_messages[user_id] = []
-        
-        chat_messages[user_id].append({
-            "message": message,
-            "response": response,
-            "created_at": str(datetime.utcnow())
-        })
+        # Store in database
+        store.add_message(user_id, message, response)
         
         return jsonify({"response": response})
     except Exception as e:
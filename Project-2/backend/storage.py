@@ -0,0 +1,173 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    message TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_user_created
+    ON chat_messages (user_id, created_at);
+"""
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache reuses the prepared form instead of re-parsing the SQL each call
+SQL_INSERT_USER = 'INSERT OR IGNORE INTO users (id, email, name, created_at) VALUES (?, ?, ?, ?)'
+SQL_GET_USER = 'SELECT id, email, name, created_at FROM users WHERE id = ?'
+SQL_INSERT_MESSAGE = 'INSERT INTO chat_messages (user_id, message, response, created_at) VALUES (?, ?, ?, ?)'
+SQL_LATEST_MESSAGES = (
+    'SELECT id, message, response, created_at FROM chat_messages '
+    'WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?'
+)
+SQL_MESSAGES_BEFORE = (
+    'SELECT id, message, response, created_at FROM chat_messages '
+    'WHERE user_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?'
+)
+SQL_MESSAGES_SINCE = (
+    'SELECT id, message, response, created_at FROM chat_messages '
+    'WHERE user_id = ? AND created_at > ? ORDER BY created_at, id LIMIT ?'
+)
+
+
+class ChatStore:
+    """
+    SQLite (WAL) storage for users and chat history.
+    Reads use one connection per thread; writes go through a single writer
+    thread that commits queued inserts in batches (group commit), so many
+    concurrent /api/chat calls share one transaction and one fsync.
+    Messages get their created_at from the writer thread as they are
+    written, strictly increasing, so rows become visible in timestamp
+    order and polling with `since` never skips one.
+    """
+
+    def __init__(self, path, batch_size=256, batch_window_ms=5):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_window = batch_window_ms / 1000.0
+        self._local = threading.local()
+        self._writes = queue.Queue()
+        self._last_stamp = datetime.min  # owned by the writer thread
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        threading.Thread(target=self._writer, daemon=True).start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        return conn
+
+    def _reader(self):
+        """Connection owned by the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _writer(self):
+        conn = self._connect()
+        while True:
+            batch = [self._writes.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._writes.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                with conn:
+                    results = [self._execute(conn, sql, params).lastrowid for sql, params, _ in batch]
+            except Exception:
+                # One bad write must not fail its neighbours, nor stop this
+                # thread (every waiting future would hang): retry one by one,
+                # failing only the writes that fail again
+                for sql, params, future in batch:
+                    try:
+                        with conn:
+                            future.set_result(self._execute(conn, sql, params).lastrowid)
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+            for (_, _, future), rowid in zip(batch, results):
+                future.set_result(rowid)
+
+    def _execute(self, conn, sql, params):
+        """Run a queued write; callable params are given the commit timestamp"""
+        return conn.execute(sql, params(self._stamp()) if callable(params) else params)
+
+    def _stamp(self):
+        """UTC timestamp, later than any given before (writer thread only)"""
+        now = datetime.utcnow()
+        if now <= self._last_stamp:
+            now = self._last_stamp + timedelta(microseconds=1)
+        self._last_stamp = now
+        return now.isoformat(sep=' ', timespec='microseconds')
+
+    def _write(self, sql, params):
+        """Queue a write and wait until its batch is committed"""
+        future = Future()
+        self._writes.put((sql, params, future))
+        return future.result()
+
+    def get_or_create_user(self, user_id, email, name, created_at):
+        self._write(SQL_INSERT_USER, (user_id, email, name, created_at))
+        return self.get_user(user_id)
+
+    def get_user(self, user_id):
+        row = self._reader().execute(SQL_GET_USER, (user_id,)).fetchone()
+        if row is None:
+            return None
+        return {'id': row[0], 'email': row[1], 'name': row[2], 'created_at': row[3]}
+
+    def add_message(self, user_id, message, response):
+        """Store a chat message, stamped with its commit time; returns its id once committed"""
+        return self._write(SQL_INSERT_MESSAGE, lambda created_at: (user_id, message, response, created_at))
+
+    def get_messages_page(self, user_id, limit, before=None):
+        """
+        Keyset page of a user's history: the newest `limit` messages older
+        than `before` (a (created_at, id) pair), oldest first.
+        Returns (messages, has_more).
+        """
+        if before is None:
+            rows = self._reader().execute(SQL_LATEST_MESSAGES, (user_id, limit + 1)).fetchall()
+        else:
+            rows = self._reader().execute(
+                SQL_MESSAGES_BEFORE, (user_id, before[0], before[1], limit + 1)
+            ).fetchall()
+        has_more = len(rows) > limit
+        return [_message(r) for r in reversed(rows[:limit])], has_more
+
+    def get_messages_since(self, user_id, since, limit):
+        """
+        Messages created after `since`, oldest first.
+        Returns (messages, has_more).
+        """
+        rows = self._reader().execute(SQL_MESSAGES_SINCE, (user_id, since, limit + 1)).fetchall()
+        return [_message(r) for r in rows[:limit]], len(rows) > limit
+
+
+def _message(row):
+    return {'id': row[0], 'message': row[1], 'response': row[2], 'created_at': row[3]}
@@ -38,13 +38,13 @@ async function handleLogin(event) {
 
 async function loadChatHistory() {
     try {
-        const response = await fetch(`${API_URL}/chat-history/${currentUserId}`);
+        const response = await fetch(`${API_URL}/chat-history/${currentUserId}?limit=3`);
         const data = await response.json();
         
         const historyDiv = document.getElementById('chatHistory');
         if (data.chats && data.chats.length > 0) {
             historyDiv.innerHTML = `<strong>Previous conversations:</strong><br>` + 
-                data.chats.slice(-3).map(c => `"${c.message}"<br>`).join('');
+                data.chats.map(c => `"${c.message}"<br>`).join('');
         } else {
             historyDiv.innerHTML = 'No previous conversations';
         }
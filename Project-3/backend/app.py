@@ -5,6 +5,9 @@ import os
 from datetime import datetime
 import uuid
 
+from thread_store import ThreadStore
+from ids import new_id
+
 load_dotenv()
 
 app = Flask(__name__)
@@ -12,9 +15,8 @@ CORS(app)
 
 # In-memory storage for demo
 users = {}
-threads = {}
+threads = ThreadStore()
 messages = {}
-thread_counter = 0
 
 @app.route('/api/auth/google', methods=['POST'])
 def google_login():
@@ -32,7 +34,7 @@ def google_login():
                 'name': name,
                 'created_at': str(datetime.utcnow())
             }
-            threads[user_id] = []
+            threads.ensure_user(user_id)
         
         return jsonify({"status": "logged_in", "user_id": user_id, "name": name})
     except Exception as e:
@@ -42,7 +44,7 @@ def google_login():
 def get_threads(user_id):
     """Get all threads for a user"""
     try:
-        user_threads = threads.get(user_id, [])
+        user_threads = threads.list_for_user(user_id)
         return jsonify({"threads": user_threads})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -51,13 +53,11 @@ def get_threads(user_id):
 def create_thread():
     """Create a new chat thread"""
     try:
-        global thread_counter
         data = request.json
         user_id = data.get('user_id')
         
-        thread_counter += 1
-        thread_id = str(thread_counter)
-        thread_name = f"Thread {thread_counter}"
+        thread_id = new_id()
+        thread_name = f"Thread {len(threads.list_for_user(user_id)) + 1}"
         
         thread_obj = {
             'id': thread_id,
@@ -65,10 +65,7 @@ def create_thread():
             'created_at': str(datetime.utcnow())
         }
         
-        if user_id not in threads:
-            threads[user_id] = []
-        
-        threads[user_id].append(thread_obj)
+        threads.create(user_id, thread_obj)
         messages[thread_id] = []
         
         return jsonify({"thread_id": thread_id, "name": thread_name})
@@ -82,12 +79,8 @@ def update_thread(thread_id):
         data = request.json
         name = data.get('name')
         
-        # Find and update thread
-        for user_id in threads:
-            for thread in threads[user_id]:
-                if thread['id'] == thread_id:
-                    thread['name'] = name
-                    return jsonify({"status": "updated"})
+        if threads.rename(thread_id, name):
+            return jsonify({"status": "updated"})
         
         return jsonify({"error": "Thread not found"}), 404
     except Exception as e:
@@ -97,12 +90,8 @@ def update_thread(thread_id):
 def delete_thread(thread_id):
     """Delete a thread"""
     try:
-        # Find and delete thread
-        for user_id in threads:
-            threads[user_id] = [t for t in threads[user_id] if t['id'] != thread_id]
-        
-        if thread_id in messages:
-            del messages[thread_id]
+        threads.delete(thread_id)
+        messages.pop(thread_id, None)
         
         return jsonify({"status": "deleted"})
     except Exception as e:
@@ -0,0 +1,70 @@
+"""
+Benchmark: rename/delete latency of ThreadStore as the number of threads
+grows, next to the previous scan-every-user approach (small sizes only,
+since it is O(total threads) per call).
+
+Run: python bench_threads.py
+"""
+import random
+import time
+
+from thread_store import ThreadStore
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LEGACY_SIZES = [1_000, 10_000]
+USERS = 1_000
+OPS = 1_000
+
+
+def build_store(n):
+    store = ThreadStore()
+    for i in range(n):
+        store.create(f"user_{i % USERS}", {'id': str(i), 'name': f"Thread {i}", 'created_at': ''})
+    return store
+
+
+def build_legacy(n):
+    threads = {}
+    for i in range(n):
+        threads.setdefault(f"user_{i % USERS}", []).append({'id': str(i), 'name': f"Thread {i}"})
+    return threads
+
+
+def legacy_rename(threads, thread_id, name):
+    for user_id in threads:
+        for thread in threads[user_id]:
+            if thread['id'] == thread_id:
+                thread['name'] = name
+                return True
+    return False
+
+
+def legacy_delete(threads, thread_id):
+    for user_id in threads:
+        threads[user_id] = [t for t in threads[user_id] if t['id'] != thread_id]
+
+
+def per_op_us(fn, ids):
+    started = time.perf_counter()
+    for thread_id in ids:
+        fn(thread_id)
+    return (time.perf_counter() - started) / len(ids) * 1e6
+
+
+if __name__ == '__main__':
+    print(f"{'threads':>10} {'rename us':>10} {'delete us':>10} {'legacy rename':>14} {'legacy delete':>14}")
+    for n in SIZES:
+        ids = [str(i) for i in random.sample(range(n), OPS)]
+        store = build_store(n)
+        rename = per_op_us(lambda t: store.rename(t, 'renamed'), ids)
+        delete = per_op_us(store.delete, ids)
+
+        legacy = ('-', '-')
+        if n in LEGACY_SIZES:
+            threads = build_legacy(n)
+            legacy_ids = ids[:100]
+            legacy = (
+                f"{per_op_us(lambda t: legacy_rename(threads, t, 'renamed'), legacy_ids):.1f}",
+                f"{per_op_us(lambda t: legacy_delete(threads, t), legacy_ids):.1f}",
+            )
+        print(f"{n:>10} {rename:>10.2f} {delete:>10.2f} {legacy[0]:>14} {legacy[1]:>14}")
@@ -0,0 +1,60 @@
+import threading
+
+
+class ThreadStore:
+    """
+    In-memory thread registry with a thread_id -> (owner, record) index
+    and a per-user insertion-ordered dict, so lookup, rename and delete
+    are O(1) regardless of how many threads exist.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id = {}    # {thread_id: (user_id, record)}
+        self._by_user = {}  # {user_id: {thread_id: record}} in creation order
+
+    def ensure_user(self, user_id):
+        with self._lock:
+            self._by_user.setdefault(user_id, {})
+
+    def create(self, user_id, record):
+        """Add a thread record (must carry an 'id') for a user"""
+        with self._lock:
+            self._by_id[record['id']] = (user_id, record)
+            self._by_user.setdefault(user_id, {})[record['id']] = record
+        return record
+
+    def get(self, thread_id):
+        entry = self._by_id.get(thread_id)
+        return entry[1] if entry else None
+
+    def owner(self, thread_id):
+        entry = self._by_id.get(thread_id)
+        return entry[0] if entry else None
+
+    def rename(self, thread_id, name):
+        """Rename a thread; returns False if it does not exist"""
+        with self._lock:
+            entry = self._by_id.get(thread_id)
+            if entry is None:
+                return False
+            entry[1]['name'] = name
+            return True
+
+    def delete(self, thread_id):
+        """Remove a thread; returns False if it does not exist"""
+        with self._lock:
+            entry = self._by_id.pop(thread_id, None)
+            if entry is None:
+                return False
+            user_id, _ = entry
+            del self._by_user[user_id][thread_id]
+            return True
+
+    def list_for_user(self, user_id):
+        """A user's threads, oldest first"""
+        with self._lock:
+            return list(self._by_user.get(user_id, {}).values())
+
+    def __len__(self):
+        return len(self._by_id)
@@ -3,7 +3,9 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 from datetime import datetime
-from collections import deque
+
+from ids import new_id
+from memory_manager import MemoryManager
 
 load_dotenv()
 
@@ -14,14 +16,19 @@ CORS(app)
 users = {}
 threads = {}
 messages = {}
-memory_buffers = {}  # Stores last 5 messages per thread
-thread_counter = 0
+
+# Token-budgeted context per thread; cold buffers are spilled to disk
+DEFAULT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1000'))
+memory_buffers = MemoryManager(
+    spill_path=os.getenv('MEMORY_SPILL_PATH', 'memory_spill.db'),
+    token_budget=DEFAULT_TOKEN_BUDGET,
+    max_resident_buffers=int(os.getenv('MEMORY_MAX_RESIDENT_BUFFERS', '10000')),
+    max_resident_bytes=int(os.getenv('MEMORY_MAX_RESIDENT_BYTES', str(64 * 1024 * 1024)))
+)
 
 def get_memory_for_thread(thread_id):
-    """Get or create memory buffer for a thread (last 5 messages)"""
-    if thread_id not in memory_buffers:
-        memory_buffers[thread_id] = deque(maxlen=5)
-    return memory_buffers[thread_id]
+    """Get or create the context window for a thread"""
+    return memory_buffers.get(thread_id)
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -38,8 +45,8 @@ def chat():
         # Get memory for this thread
         memory = get_memory_for_thread(thread_id)
         
-        # Build context from previous messages
-        context = "\n".join([f"User: {m[0]}\nBot: {m[1]}" for m in memory])
+        # Context is kept pre-rendered within the thread's token budget
+        context = memory.context
         
         # Generate response with context
         if context:
@@ -48,7 +55,7 @@ def chat():
             response = f"[New conversation] Response to: {message}"
         
         # Add to memory
-        memory.append((message, response))
+        memory = memory_buffers.append(thread_id, message, response)
         
         # Store in messages
         if thread_id not in messages:
@@ -62,7 +69,9 @@ def chat():
         
         return jsonify({
             "response": response,
-            "memory_size": len(memory)
+            "memory_size": len(memory),
+            "context_tokens": memory.tokens,
+            "token_budget": memory.token_budget
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -80,13 +89,11 @@ def get_threads(user_id):
 def create_thread():
     """Create a new chat thread"""
     try:
-        global thread_counter
         data = request.json
         user_id = data.get('user_id')
         
-        thread_counter += 1
-        thread_id = str(thread_counter)
-        thread_name = f"Thread {thread_counter}"
+        thread_id = new_id()
+        thread_name = f"Thread {len(threads.get(user_id, [])) + 1}"
         
         thread_obj = {
             'id': thread_id,
@@ -99,7 +106,7 @@ def create_thread():
         
         threads[user_id].append(thread_obj)
         messages[thread_id] = []
-        memory_buffers[thread_id] = deque(maxlen=5)
+        get_memory_for_thread(thread_id)
         
         return jsonify({"thread_id": thread_id, "name": thread_name})
     except Exception as e:
@@ -110,14 +117,50 @@ def get_thread_messages(thread_id):
     """Get all messages in a thread"""
     try:
         thread_msgs = messages.get(thread_id, [])
-        memory = memory_buffers.get(thread_id, [])
+        memory = get_memory_for_thread(thread_id)
         return jsonify({
             "messages": thread_msgs,
             "memory_size": len(memory),
-            "memory_max": 5
+            "context_tokens": memory.tokens,
+            "token_budget": memory.token_budget
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/threads/<thread_id>/context', methods=['GET'])
+def get_context_settings(thread_id):
+    """Get a thread's context budget and usage"""
+    try:
+        return jsonify(get_memory_for_thread(thread_id).settings())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/threads/<thread_id>/context', methods=['PUT'])
+def update_context_settings(thread_id):
+    """
+    Update a thread's context settings
+    Expected JSON: {"token_budget": 1000, "summarize": true} (both optional)
+    """
+    try:
+        data = request.json
+        token_budget = data.get('token_budget')
+        summarize = data.get('summarize')
+        
+        # bool is an int subclass: reject true/false explicitly
+        if token_budget is not None and (isinstance(token_budget, bool) or not isinstance(token_budget, int) or token_budget < 1):
+            return jsonify({"error": "token_budget must be a positive integer"}), 400
+        if summarize is not None and not isinstance(summarize, bool):
+            return jsonify({"error": "summarize must be a boolean"}), 400
+        
+        memory = memory_buffers.configure(thread_id, token_budget, summarize)
+        return jsonify(memory.settings())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/memory/stats', methods=['GET'])
+def memory_stats():
+    """Resident/spilled memory buffer metrics"""
+    return jsonify(memory_buffers.stats())
+
 if __name__ == '__main__':
     app.run(debug=False, port=5003, use_reloader=False)
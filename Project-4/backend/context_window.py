@@ -0,0 +1,139 @@
+from collections import deque
+
+SUMMARY_RATIO = 0.25  # share of the token budget older-turn summaries may use
+SUMMARY_SNIPPET_CHARS = 80
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def render_turn(message, response):
+    return f"User: {message}\nBot: {response}\n"
+
+
+def summarize_turns(previous_summary, turns):
+    """
+    Fold evicted turns into the running summary.
+    TODO: Replace with a Gemini summarization call; this extractive
+    fallback keeps a snippet of what the user said in each turn.
+    """
+    notes = [message[:SUMMARY_SNIPPET_CHARS] for message, _ in turns]
+    if previous_summary:
+        notes.insert(0, previous_summary)
+    return '; '.join(notes)
+
+
+class ContextWindow:
+    """
+    Conversation context for one thread, bounded by a token budget.
+    The rendered context is kept as a single string that is appended to
+    and trimmed from the front as turns come and go, so producing the
+    context for a request never re-renders the window. When summarize is
+    on, evicted turns are folded into a cached summary that is prepended.
+    """
+
+    def __init__(self, token_budget, summarize=False):
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.summary = ''
+        self._turns = deque()  # (message, response, rendered, tokens)
+        self._rendered = ''
+        self._turn_tokens = 0
+        self._summary_tokens = 0
+
+    def __len__(self):
+        return len(self._turns)
+
+    @property
+    def tokens(self):
+        return self._turn_tokens + self._summary_tokens
+
+    @property
+    def nbytes(self):
+        return len(self._rendered) + len(self.summary)
+
+    @property
+    def context(self):
+        if self.summary:
+            return f"Summary of earlier conversation: {self.summary}\n{self._rendered}"
+        return self._rendered
+
+    def append(self, message, response):
+        rendered = render_turn(message, response)
+        tokens = estimate_tokens(rendered)
+        self._turns.append((message, response, rendered, tokens))
+        self._rendered += rendered
+        self._turn_tokens += tokens
+        self._trim()
+
+    def configure(self, token_budget=None, summarize=None):
+        if token_budget is not None:
+            self.token_budget = token_budget
+        if summarize is not None:
+            self.summarize = summarize
+            if not summarize:
+                self._set_summary('')
+        self._trim()
+
+    def _trim(self):
+        cut = 0
+        while self._turns and self.tokens > self.token_budget:
+            message, response, rendered, tokens = self._turns.popleft()
+            cut += len(rendered)
+            self._turn_tokens -= tokens
+            if self.summarize:
+                self._fold([(message, response)])
+        if cut:
+            self._rendered = self._rendered[cut:]
+
+    def _fold(self, turns):
+        summary = summarize_turns(self.summary, turns)
+        max_chars = int(self.token_budget * SUMMARY_RATIO) * 4
+        if len(summary) > max_chars:
+            # Keep the most recent notes that fit; if not even the last one
+            # does, its end from a word boundary
+            start = len(summary) - max_chars
+            if not summary.startswith('; ', start - 2):
+                boundary = summary.find('; ', start)
+                if boundary != -1:
+                    start = boundary + 2
+                elif not summary[start - 1].isspace():
+                    boundary = summary.find(' ', start)
+                    start = boundary + 1 if boundary != -1 else len(summary)
+            summary = summary[start:]
+        self._set_summary(summary)
+
+    def _set_summary(self, summary):
+        self.summary = summary
+        self._summary_tokens = estimate_tokens(summary) if summary else 0
+
+    def to_state(self):
+        return {
+            'token_budget': self.token_budget,
+            'summarize': self.summarize,
+            'summary': self.summary,
+            'turns': [[t[0], t[1]] for t in self._turns]
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        window = cls(state['token_budget'], state['summarize'])
+        window._set_summary(state['summary'])
+        for message, response in state['turns']:
+            rendered = render_turn(message, response)
+            tokens = estimate_tokens(rendered)
+            window._turns.append((message, response, rendered, tokens))
+            window._rendered += rendered
+            window._turn_tokens += tokens
+        return window
+
+    def settings(self):
+        return {
+            'token_budget': self.token_budget,
+            'summarize': self.summarize,
+            'context_tokens': self.tokens,
+            'turns': len(self._turns),
+            'has_summary': bool(self.summary)
+        }
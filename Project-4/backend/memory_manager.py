@@ -0,0 +1,125 @@
+import json
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+
+from context_window import ContextWindow
+
+
+class MemoryManager:
+    """
+    Per-thread conversation memory (ContextWindow) under a global budget.
+    Hot buffers stay in RAM in LRU order; once the resident entry or byte
+    budget is exceeded the coldest buffers are spilled to a compact
+    (zlib-compressed JSON in SQLite) store and rehydrated on next access.
+    """
+
+    def __init__(self, spill_path, token_budget=1000, max_resident_buffers=10000, max_resident_bytes=64 * 1024 * 1024):
+        self.token_budget = token_budget
+        self.max_resident_buffers = max_resident_buffers
+        self.max_resident_bytes = max_resident_bytes
+        self._buffers = OrderedDict()  # {thread_id: ContextWindow}
+        self._sizes = {}               # {thread_id: approximate bytes}
+        self._resident_bytes = 0
+        self._lock = threading.RLock()
+        self.lookups = 0
+        self.spills = 0
+        self.rehydrations = 0
+
+        self._disk = sqlite3.connect(spill_path, check_same_thread=False)
+        self._disk.execute('PRAGMA journal_mode=WAL')
+        self._disk.execute(
+            'CREATE TABLE IF NOT EXISTS spilled_windows ('
+            'thread_id TEXT PRIMARY KEY, data BLOB NOT NULL)'
+        )
+        self._disk.commit()
+
+    def get(self, thread_id):
+        """Buffer for a thread, rehydrating it from disk if it was spilled"""
+        with self._lock:
+            self.lookups += 1
+            return self._load(thread_id)
+
+    def _load(self, thread_id):
+        buffer = self._buffers.get(thread_id)
+        if buffer is not None:
+            self._buffers.move_to_end(thread_id)
+            return buffer
+
+        row = self._disk.execute(
+            'SELECT data FROM spilled_windows WHERE thread_id = ?', (thread_id,)
+        ).fetchone()
+        if row is not None:
+            buffer = ContextWindow.from_state(json.loads(zlib.decompress(row[0])))
+            self._disk.execute('DELETE FROM spilled_windows WHERE thread_id = ?', (thread_id,))
+            self._disk.commit()
+            self.rehydrations += 1
+        else:
+            buffer = ContextWindow(self.token_budget)
+
+        self._buffers[thread_id] = buffer
+        self._sizes[thread_id] = buffer.nbytes
+        self._resident_bytes += buffer.nbytes
+        self._evict(keep=thread_id)
+        return buffer
+
+    def append(self, thread_id, message, response):
+        """Add an exchange to a thread's buffer, keeping the budget"""
+        return self._update(thread_id, lambda buffer: buffer.append(message, response))
+
+    def configure(self, thread_id, token_budget=None, summarize=None):
+        """Change a thread's context settings"""
+        return self._update(thread_id, lambda buffer: buffer.configure(token_budget, summarize))
+
+    def _update(self, thread_id, change):
+        with self._lock:
+            buffer = self._load(thread_id)
+            change(buffer)
+            self._resident_bytes += buffer.nbytes - self._sizes[thread_id]
+            self._sizes[thread_id] = buffer.nbytes
+            self._evict(keep=thread_id)
+            return buffer
+
+    def _evict(self, keep=None):
+        spilled = []
+        while (len(self._buffers) > self.max_resident_buffers
+               or self._resident_bytes > self.max_resident_bytes):
+            thread_id = next(iter(self._buffers))
+            if thread_id == keep:
+                if len(self._buffers) == 1:
+                    break
+                self._buffers.move_to_end(thread_id)
+                continue
+            buffer = self._buffers.pop(thread_id)
+            self._resident_bytes -= self._sizes.pop(thread_id)
+            if (not len(buffer) and not buffer.summary and not buffer.summarize
+                    and buffer.token_budget == self.token_budget):
+                continue  # same as a fresh buffer: nothing to keep
+            state = buffer.to_state()
+            data = zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+            spilled.append((thread_id, data))
+
+        if spilled:
+            self._disk.executemany(
+                'INSERT OR REPLACE INTO spilled_windows (thread_id, data) VALUES (?, ?)',
+                spilled
+            )
+            self._disk.commit()
+            self.spills += len(spilled)
+
+    def stats(self):
+        with self._lock:
+            spilled_buffers = self._disk.execute('SELECT COUNT(*) FROM spilled_windows').fetchone()[0]
+            return {
+                'resident_buffers': len(self._buffers),
+                'resident_bytes': self._resident_bytes,
+                'max_resident_buffers': self.max_resident_buffers,
+                'max_resident_bytes': self.max_resident_bytes,
+                'spilled_buffers': spilled_buffers,
+                'lookups': self.lookups,
+                'spills': self.spills,
+                'rehydrations': self.rehydrations,
+                'spill_rate': round(self.spills / self.lookups, 4) if self.lookups else 0.0,
+                'rehydration_rate': round(self.rehydrations / self.lookups, 4) if self.lookups else 0.0
+            }
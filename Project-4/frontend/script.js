@@ -82,7 +82,7 @@ function selectThread(threadId) {
     }
     document.getElementById('messages').innerHTML = '';
     document.getElementById('userInput').value = '';
-    document.getElementById('memoryStatus').textContent = 'Memory: 0/5';
+    document.getElementById('memoryStatus').textContent = 'Memory: 0 tokens';
     renderThreadsList();
     loadThreadMessages();
 }
@@ -100,7 +100,7 @@ async function loadThreadMessages() {
             displayMessage(msg.response, 'bot', isContextAware);
         });
         
-        document.getElementById('memoryStatus').textContent = `Memory: ${data.memory_size}/${data.memory_max}`;
+        document.getElementById('memoryStatus').textContent = `Memory: ${data.context_tokens}/${data.token_budget} tokens`;
     } catch (error) {
         console.error('Error loading messages:', error);
     }
@@ -134,7 +134,7 @@ async function sendMessage() {
         const data = await response.json();
         const hasMemory = data.memory_size > 1;
         displayMessage(data.response || data.error, 'bot', hasMemory);
-        document.getElementById('memoryStatus').textContent = `Memory: ${data.memory_size}/5`;
+        document.getElementById('memoryStatus').textContent = `Memory: ${data.context_tokens}/${data.token_budget} tokens`;
     } catch (error) {
         displayMessage('Error connecting to server', 'bot', false);
         console.error('Error:', error);
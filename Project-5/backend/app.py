@@ -4,6 +4,10 @@ from dotenv import load_dotenv
 import os
 from datetime import datetime
 
+from ids import new_id
+from intent_router import IntentRouter
+from artifacts import build_artifacts, serve_artifact
+
 load_dotenv()
 
 app = Flask(__name__)
@@ -13,7 +17,6 @@ CORS(app)
 users = {}
 threads = {}
 messages = {}
-thread_counter = 0
 
 # Sample rich media responses
 SAMPLE_RESPONSES = {
@@ -55,8 +58,9 @@ print(f"Result: {result}")
     "default": """# Welcome to Rich Media Chat!
 
 This chat supports:
+
 - **Images** (markdown format)
-- **Videos** (embedded iframes)  
+- **Videos** (embedded iframes)
 - **Tables** (markdown tables)
 - **Formulas** (LaTeX with MathJax)
 - **Code** (syntax highlighted)
@@ -64,6 +68,13 @@ This chat supports:
 Try asking about any of these features!"""
 }
 
+# Keyword -> response type tables, compiled once at startup
+INTENT_CONFIG = os.getenv('INTENT_CONFIG', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intents.json'))
+intent_router = IntentRouter.from_config(INTENT_CONFIG)
+
+# Rendered, serialized and precompressed once; responses reuse the bytes
+RESPONSE_ARTIFACTS = build_artifacts(SAMPLE_RESPONSES)
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Handle chat with rich media responses"""
@@ -74,19 +85,8 @@ def chat():
         message = data.get('message', '')
         
         # Determine response type based on message
-        message_lower = message.lower()
-        response = SAMPLE_RESPONSES['default']
-        
-        if 'image' in message_lower or 'photo' in message_lower:
-            response = SAMPLE_RESPONSES['image']
-        elif 'video' in message_lower or 'youtube' in message_lower:
-            response = SAMPLE_RESPONSES['video']
-        elif 'table' in message_lower or 'data' in message_lower:
-            response = SAMPLE_RESPONSES['table']
-        elif 'formula' in message_lower or 'equation' in message_lower or 'math' in message_lower:
-            response = SAMPLE_RESPONSES['formula']
-        elif 'code' in message_lower or 'python' in message_lower or 'javascript' in message_lower:
-            response = SAMPLE_RESPONSES['code']
+        intent = intent_router.route(message)
+        artifact = RESPONSE_ARTIFACTS.get(intent, RESPONSE_ARTIFACTS['default'])
         
         # Store message
         if thread_id not in messages:
@@ -94,14 +94,23 @@ def chat():
         
         messages[thread_id].append({
             "message": message,
-            "response": response,
+            "response": artifact.text,
+            "type": artifact.name,
             "created_at": str(datetime.utcnow())
         })
         
-        return jsonify({"response": response})
+        return serve_artifact(artifact, request)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/responses/<name>', methods=['GET'])
+def get_response_artifact(name):
+    """Cacheable pre-rendered response (ETag / If-None-Match aware)"""
+    artifact = RESPONSE_ARTIFACTS.get(name)
+    if artifact is None:
+        return jsonify({"error": "Response not found"}), 404
+    return serve_artifact(artifact, request, cache_control='public, max-age=86400')
+
 @app.route('/api/threads/<user_id>', methods=['GET'])
 def get_threads(user_id):
     """Get all threads for a user"""
@@ -115,13 +124,11 @@ def get_threads(user_id):
 def create_thread():
     """Create a new chat thread"""
     try:
-        global thread_counter
         data = request.json
         user_id = data.get('user_id')
         
-        thread_counter += 1
-        thread_id = str(thread_counter)
-        thread_name = f"Thread {thread_counter}"
+        thread_id = new_id()
+        thread_name = f"Thread {len(threads.get(user_id, [])) + 1}"
         
         thread_obj = {
             'id': thread_id,
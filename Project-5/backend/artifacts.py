@@ -0,0 +1,69 @@
+import gzip
+import hashlib
+import json
+
+import markdown
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Chosen so the HTML matches what the frontend's markdown-it (typographer
+# on) renders from the same text; python-markdown needs a blank line
+# before a list, so response texts keep one
+MARKDOWN_EXTENSIONS = ['tables', 'fenced_code', 'smarty']
+
+
+class ResponseArtifact:
+    """
+    A canned chat response prepared once at startup: markdown rendered to
+    HTML, the JSON body serialized, and brotli/gzip/identity bodies (each
+    with its own strong ETag) ready to be written out as-is.
+    """
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.html = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+        body = json.dumps(
+            {"response": text, "html": self.html, "type": name},
+            ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+        # Ordered by preference for content negotiation
+        self.bodies = {}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(body, quality=11)
+        self.bodies['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+        self.bodies['identity'] = body
+
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etags = {
+            encoding: digest if encoding == 'identity' else f"{digest}-{encoding}"
+            for encoding in self.bodies
+        }
+
+
+def build_artifacts(responses):
+    """Prepare an artifact for every entry of a {name: markdown} table"""
+    return {name: ResponseArtifact(name, text) for name, text in responses.items()}
+
+
+def serve_artifact(artifact, request, cache_control='no-cache'):
+    """
+    Respond with an artifact's precompressed bytes, picking the best
+    encoding the client accepts. Conditional GETs get a bodyless 304.
+    """
+    encoding = request.accept_encodings.best_match(list(artifact.bodies), default='identity')
+    etag = artifact.etags[encoding]
+    if request.method in ('GET', 'HEAD') and etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(artifact.bodies[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,77 @@
+"""
+Microbenchmark: compiled IntentRouter vs the previous if/elif chain of
+substring tests, on the shipped intent table and on a synthetic table
+with many keywords (where the chain pays one scan per keyword).
+
+Run: python bench_router.py
+"""
+import os
+import random
+import string
+import timeit
+
+from intent_router import IntentRouter
+
+MESSAGES = [
+    "Show code example",
+    "Display a formula",
+    "Create a table",
+    "Embed an image",
+    "Can you walk me through how transformers use attention over long documents in practice?",
+]
+
+
+def legacy_route(message):
+    message_lower = message.lower()
+    if 'image' in message_lower or 'photo' in message_lower:
+        return 'image'
+    elif 'video' in message_lower or 'youtube' in message_lower:
+        return 'video'
+    elif 'table' in message_lower or 'data' in message_lower:
+        return 'table'
+    elif 'formula' in message_lower or 'equation' in message_lower or 'math' in message_lower:
+        return 'formula'
+    elif 'code' in message_lower or 'python' in message_lower or 'javascript' in message_lower:
+        return 'code'
+    return 'default'
+
+
+def synthetic_intents(n_intents, keywords_per_intent):
+    rng = random.Random(0)
+    words = set()
+    while len(words) < n_intents * keywords_per_intent:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10))))
+    words = sorted(words)
+    return [
+        {'name': f'intent_{i}', 'priority': i + 1,
+         'keywords': words[i * keywords_per_intent:(i + 1) * keywords_per_intent]}
+        for i in range(n_intents)
+    ]
+
+
+def legacy_chain(intents):
+    def route(message):
+        message_lower = message.lower()
+        for intent in intents:
+            if any(k in message_lower for k in intent['keywords']):
+                return intent['name']
+        return 'default'
+    return route
+
+
+def per_call_us(fn, messages, number=2000):
+    total = timeit.timeit(lambda: [fn(m) for m in messages], number=number)
+    return total / (number * len(messages)) * 1e6
+
+
+if __name__ == '__main__':
+    router = IntentRouter.from_config(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intents.json'))
+    print(f"shipped table      if/elif: {per_call_us(legacy_route, MESSAGES):6.2f} us   "
+          f"router: {per_call_us(router.route, MESSAGES):6.2f} us")
+
+    for n_intents in (20, 100):
+        intents = synthetic_intents(n_intents, 10)
+        big_router = IntentRouter(intents)
+        chain = legacy_chain(intents)
+        print(f"{n_intents * 10:4} keywords      if/elif: {per_call_us(chain, MESSAGES, 500):6.2f} us   "
+              f"router: {per_call_us(big_router.route, MESSAGES, 500):6.2f} us")
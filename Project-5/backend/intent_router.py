@@ -0,0 +1,63 @@
+import json
+import re
+
+_WORD = re.compile(r'\w+')
+
+
+class IntentRouter:
+    """
+    Keyword intent router driven by a hash table of keywords. The message
+    is tokenized in one regex pass and each word (or run of words, for
+    multi-word keywords) is a dict lookup, so the cost depends on message
+    length rather than on how many keywords are configured. Matching is on
+    whole words ("data" does not fire inside "database") and ties between
+    intents are settled by explicit priority (1 is highest).
+    """
+
+    def __init__(self, intents, default='default'):
+        self.default = default
+        self._priority = {}
+        self._keyword_intent = {}
+        self._max_words = 1
+        for intent in intents:
+            self._priority[intent['name']] = intent['priority']
+            for keyword in intent['keywords']:
+                words = _WORD.findall(keyword.lower())
+                key = ' '.join(words)
+                if key in self._keyword_intent:
+                    raise ValueError(f"Keyword '{keyword}' is mapped to more than one intent")
+                self._keyword_intent[key] = intent['name']
+                self._max_words = max(self._max_words, len(words))
+
+    @classmethod
+    def from_config(cls, path):
+        """Load intent tables from a JSON file: {"default": ..., "intents": [...]}"""
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config['intents'], config.get('default', 'default'))
+
+    def matches(self, text):
+        """All intents hit by a message: {intent: [keywords]}"""
+        hits = {}
+        lookup = self._keyword_intent.get
+        words = _WORD.findall(text.lower())
+        if self._max_words == 1:
+            for word in words:
+                intent = lookup(word)
+                if intent is not None:
+                    hits.setdefault(intent, []).append(word)
+            return hits
+        for i in range(len(words)):
+            for n in range(1, min(self._max_words, len(words) - i) + 1):
+                keyword = words[i] if n == 1 else ' '.join(words[i:i + n])
+                intent = lookup(keyword)
+                if intent is not None:
+                    hits.setdefault(intent, []).append(keyword)
+        return hits
+
+    def route(self, text):
+        """Highest-priority intent hit by a message, or the default"""
+        hits = self.matches(text)
+        if not hits:
+            return self.default
+        return min(hits, key=self._priority.__getitem__)
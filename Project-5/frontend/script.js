@@ -3,6 +3,7 @@ let currentUserId = null;
 let currentUserName = null;
 let currentThreadId = null;
 let userThreads = [];
+let renderedResponses = {};  // Pre-rendered HTML by response type
 
 // Initialize Markdown-it
 const md = window.markdownit({
@@ -112,7 +113,7 @@ async function loadThreadMessages() {
         
         data.messages.forEach(msg => {
             displayMessage(msg.message, 'user');
-            displayMessage(msg.response, 'bot');
+            displayMessage(msg.response, 'bot', renderedResponses[msg.type]);
         });
     } catch (error) {
         console.error('Error loading messages:', error);
@@ -145,21 +146,22 @@ async function sendMessage() {
         });
         
         const data = await response.json();
-        displayMessage(data.response || data.error, 'bot');
+        if (data.html) renderedResponses[data.type] = data.html;
+        displayMessage(data.response || data.error, 'bot', data.html);
     } catch (error) {
         displayMessage('Error connecting to server', 'bot');
         console.error('Error:', error);
     }
 }
 
-function displayMessage(text, sender) {
+function displayMessage(text, sender, html) {
     const messagesDiv = document.getElementById('messages');
     const messageDiv = document.createElement('div');
     messageDiv.className = `message ${sender}-message`;
     
     if (sender === 'bot') {
-        // Render markdown for bot messages
-        messageDiv.innerHTML = md.render(text);
+        // Use the server's pre-rendered HTML when available, else render markdown
+        messageDiv.innerHTML = html || md.render(text);
         
         // Trigger syntax highlighting for code blocks
         messagesDiv.appendChild(messageDiv);
@@ -1,9 +1,18 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, send_file
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 from datetime import datetime
 import base64
+import json
+import time
+import random
+from PIL import Image, ImageDraw
+
+from ids import new_id
+from jobs import JobQueue, QueueFull
+from image_store import ImageStore, image_key, VARIANTS
+from prompt_cache import PromptCache
 
 load_dotenv()
 
@@ -14,20 +23,37 @@ CORS(app)
 users = {}
 threads = {}
 messages = {}
-thread_counter = 0
-
-# Sample image URLs (simulating generated images)
-SAMPLE_IMAGES = {
-    "sunset": "https://images.unsplash.com/photo-1495567720989-cebdbdd97913?w=400&h=300&fit=crop",
-    "mountain": "https://images.unsplash.com/photo-1506905925346-21bda4d32df4?w=400&h=300&fit=crop",
-    "ocean": "https://images.unsplash.com/photo-1505142468610-359e7d316be0?w=400&h=300&fit=crop",
-    "forest": "https://images.unsplash.com/photo-1441974231531-c6227db76b6e?w=400&h=300&fit=crop",
-    "city": "https://images.unsplash.com/photo-1480714378408-67cf0d13bc1b?w=400&h=300&fit=crop",
-    "space": "https://images.unsplash.com/photo-1419242902214-272b3f66ee7a?w=400&h=300&fit=crop",
-    "abstract": "https://images.unsplash.com/photo-1557672172-298e090d0f80?w=400&h=300&fit=crop",
-    "nature": "https://images.unsplash.com/photo-1502933691298-84fc14542831?w=400&h=300&fit=crop",
+
+# Colour themes for simulated generations (top and bottom of the gradient)
+IMAGE_THEMES = {
+    "sunset": ((255, 94, 58), (88, 40, 120)),
+    "mountain": ((170, 200, 230), (70, 90, 80)),
+    "ocean": ((120, 200, 240), (10, 60, 130)),
+    "forest": ((150, 200, 120), (20, 70, 30)),
+    "city": ((200, 200, 215), (40, 40, 60)),
+    "space": ((20, 20, 60), (0, 0, 0)),
+    "abstract": ((240, 80, 160), (40, 200, 220)),
+    "nature": ((200, 230, 150), (60, 120, 60)),
 }
 
+# Generation parameters; part of the content address of every stored image
+IMAGE_PARAMS = {"model": "gemini-2.0-image-simulated", "width": 400, "height": 300}
+
+# Local content-addressed store for generated images
+IMAGE_STORE_DIR = os.getenv('IMAGE_STORE_DIR', 'generated_images')
+image_store = ImageStore(IMAGE_STORE_DIR, max_bytes=int(os.getenv('IMAGE_STORE_MAX_BYTES', str(512 * 1024 * 1024))))
+
+# Near-duplicate prompts reuse an earlier generation. IMAGE_PROMPT_SIMILARITY
+# (0-1, n-gram Jaccard) also matches similar wording; unset means exact
+# matches of the normalized, token-sorted prompt only
+prompt_cache = PromptCache(
+    max_entries=int(os.getenv('IMAGE_PROMPT_CACHE_SIZE', '10000')),
+    similarity_threshold=float(os.getenv('IMAGE_PROMPT_SIMILARITY', '0')) or None
+)
+
+# Base URL the frontend uses to fetch stored images
+PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', 'http://localhost:5005')
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Handle chat with image generation capability"""
@@ -47,25 +73,67 @@ def chat():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def generate_image(prompt, thread_id, user_id):
-    """Simulate image generation"""
-    try:
-        # Extract image prompt from user message
-        image_prompt = prompt.replace('generate image of', '').replace('generate image', '').strip()
-        
-        # Find matching image from sample library
-        image_url = None
-        for keyword, url in SAMPLE_IMAGES.items():
-            if keyword in image_prompt.lower():
-                image_url = url
-                break
-        
-        if not image_url:
-            # Use a default image
-            image_url = SAMPLE_IMAGES['abstract']
-        
-        # Create markdown response with image
-        response = f"""# Generated Image: {image_prompt}
+def extract_image_prompt(message):
+    """Extract image prompt from user message"""
+    return message.replace('generate image of', '').replace('generate image', '').strip()
+
+def synthesize_image(image_prompt, params):
+    """
+    Simulate the image model: a themed gradient with shapes seeded by the prompt.
+    TODO: Replace with Gemini 2.0 image generation
+    """
+    top, bottom = IMAGE_THEMES['abstract']
+    for keyword, colours in IMAGE_THEMES.items():
+        if keyword in image_prompt.lower():
+            top, bottom = colours
+            break
+    
+    width, height = params['width'], params['height']
+    image = Image.new('RGB', (width, height))
+    draw = ImageDraw.Draw(image)
+    for y in range(height):
+        t = y / (height - 1)
+        draw.line([(0, y), (width, y)], fill=tuple(int(a + (b - a) * t) for a, b in zip(top, bottom)))
+    
+    rng = random.Random(image_prompt)
+    for _ in range(6):
+        x, y, r = rng.randint(0, width), rng.randint(0, height), rng.randint(10, 60)
+        draw.ellipse([x - r, y - r, x + r, y + r], outline=(255, 255, 255), width=2)
+    return image
+
+def render_image(image_prompt, report_progress=None):
+    """Generate an image, or reuse the stored one for the same or a similar prompt"""
+    key = prompt_cache.lookup(image_prompt)
+    if key is not None and not image_store.contains(key):
+        # The image was garbage collected from the store
+        prompt_cache.discard(image_prompt)
+        key = None
+    cached = key is not None
+    
+    if not cached:
+        # The store is keyed on the exact prompt; only the prompt cache matches loosely
+        key = image_key(image_prompt, IMAGE_PARAMS)
+        if image_store.contains(key):
+            # Generated before, then dropped from the prompt cache
+            seconds = image_store.generation_seconds(key) or 0.0
+        else:
+            started = time.perf_counter()
+            # Simulated model latency, reported as progress steps
+            steps = 5
+            for step in range(1, steps + 1):
+                time.sleep(IMAGE_GEN_SECONDS / steps)
+                if report_progress:
+                    report_progress(int(step * 100 / steps) - 1)
+            image = synthesize_image(image_prompt, IMAGE_PARAMS)
+            seconds = time.perf_counter() - started
+            image_store.put(key, image, generation_seconds=seconds)
+        prompt_cache.add(image_prompt, key, seconds)
+    
+    image_url = f"{PUBLIC_BASE_URL}/api/images/{key}/webp"
+    thumbnail_url = f"{PUBLIC_BASE_URL}/api/images/{key}/thumb"
+    
+    # Create markdown response with image
+    response = f"""# Generated Image: {image_prompt}
 
 ![Generated: {image_prompt}]({image_url})
 
@@ -74,27 +142,144 @@ def generate_image(prompt, thread_id, user_id):
 **Generated at:** {datetime.utcnow().isoformat()}
 
 This is a simulated image generation. In production, this would use Gemini 2.0 API."""
-        
-        # Store message
-        if thread_id not in messages:
-            messages[thread_id] = []
-        
-        messages[thread_id].append({
-            "message": f"Generate image of {image_prompt}",
-            "response": response,
-            "image_url": image_url,
-            "created_at": str(datetime.utcnow())
-        })
+    
+    return {
+        "response": response,
+        "type": "image",
+        "image_url": image_url,
+        "thumbnail_url": thumbnail_url,
+        "image_key": key,
+        "cached": cached,
+        "prompt": image_prompt
+    }
+
+def run_image_job(job, report_progress):
+    return render_image(job.payload['prompt'], report_progress)
+
+def store_image_message(job, result):
+    """Record a finished generation in its thread"""
+    thread_id = job.payload['thread_id']
+    if thread_id not in messages:
+        messages[thread_id] = []
+    
+    messages[thread_id].append({
+        "message": f"Generate image of {result['prompt']}",
+        "response": result['response'],
+        "image_url": result['image_url'],
+        "created_at": str(datetime.utcnow())
+    })
+
+# Background image generation: bounded queue, fixed worker pool, per-user limit
+IMAGE_GEN_SECONDS = float(os.getenv('IMAGE_GEN_SECONDS', '2'))
+image_jobs = JobQueue(
+    run_image_job,
+    on_complete=store_image_message,
+    workers=int(os.getenv('IMAGE_WORKERS', '4')),
+    max_queued=int(os.getenv('IMAGE_MAX_QUEUED', '100')),
+    per_user_limit=int(os.getenv('IMAGE_JOBS_PER_USER', '1'))
+)
+
+def generate_image(prompt, thread_id, user_id, webhook_url=None):
+    """Queue an image generation job and return its id immediately"""
+    try:
+        image_prompt = extract_image_prompt(prompt)
+        job = image_jobs.submit(user_id, {'prompt': image_prompt, 'thread_id': thread_id}, webhook_url)
         
         return jsonify({
-            "response": response,
-            "type": "image",
-            "image_url": image_url,
+            "response": f"Generating image: {image_prompt}",
+            "type": "image_job",
+            "job_id": job.id,
+            "status": job.status,
             "prompt": image_prompt
-        })
+        }), 202
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/images/generate', methods=['POST'])
+def create_image_job():
+    """
+    Queue an image generation
+    Expected JSON: {"user_id": "...", "thread_id": "...", "prompt": "...", "webhook_url": "..." (optional)}
+    """
+    try:
+        data = request.json
+        prompt = data.get('prompt', '')
+        if not prompt:
+            return jsonify({"error": "No prompt provided"}), 400
+        return generate_image(prompt, data.get('thread_id'), data.get('user_id'), data.get('webhook_url'))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/images/<key>/<variant>', methods=['GET'])
+def serve_image(key, variant):
+    """
+    Serve a stored image variant (original, webp, thumb).
+    Content-addressed, so responses are immutable: Range requests, ETags
+    and long-lived caching are all supported.
+    """
+    path = image_store.path(key, variant)
+    if path is None:
+        return jsonify({"error": "Image not found"}), 404
+    
+    response = send_file(
+        path,
+        mimetype=VARIANTS[variant][1],
+        conditional=True,
+        etag=f"{key[:32]}-{variant}",
+        max_age=31536000
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/images/stats', methods=['GET'])
+def image_store_stats():
+    """Generated image store and prompt cache metrics"""
+    return jsonify({
+        "store": image_store.stats(),
+        "prompt_cache": prompt_cache.stats()
+    })
+
+@app.route('/api/jobs/stats', methods=['GET'])
+def job_stats():
+    """Image job queue depth and counters"""
+    return jsonify(image_jobs.stats())
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll an image generation job"""
+    job = image_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Stream an image generation job's progress as Server-Sent Events"""
+    job = image_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    def events():
+        version = -1
+        while True:
+            new_version, state = image_jobs.wait_for_change(job, version, timeout=15)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+            if state['status'] in ('succeeded', 'failed'):
+                return
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/threads/<user_id>', methods=['GET'])
 def get_threads(user_id):
     """Get all threads for a user"""
@@ -108,13 +293,11 @@ def get_threads(user_id):
 def create_thread():
     """Create a new chat thread"""
     try:
-        global thread_counter
         data = request.json
         user_id = data.get('user_id')
         
-        thread_counter += 1
-        thread_id = str(thread_counter)
-        thread_name = f"Thread {thread_counter}"
+        thread_id = new_id()
+        thread_name = f"Thread {len(threads.get(user_id, [])) + 1}"
         
         thread_obj = {
             'id': thread_id,
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+THUMBNAIL_SIZE = (160, 120)
+
+# variant name -> (file name, mimetype)
+VARIANTS = {
+    'original': ('original.png', 'image/png'),
+    'webp': ('image.webp', 'image/webp'),
+    'thumb': ('thumb.webp', 'image/webp'),
+}
+
+# Per-entry metadata (how long the generation took); never served
+META_FILE = 'meta.json'
+
+
+def image_key(prompt, params):
+    """Content address for a generation: hash of the prompt plus its parameters"""
+    canonical = json.dumps({'prompt': prompt, 'params': params}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ImageStore:
+    """
+    Content-addressed store for generated images on local disk.
+    Each entry is a directory <root>/<key[:2]>/<key>/ holding the original
+    PNG plus WebP and thumbnail variants produced at write time. Entries
+    are written to a temp directory and renamed into place, so readers
+    never see a partial entry. Total size is capped; the least recently
+    used entries are deleted when a write goes over the cap.
+    """
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        # Absolute, so paths handed to send_file don't resolve against the app's root_path
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {key: bytes on disk}, least recently used first
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Rebuild the LRU index from disk (directory mtime = last access)"""
+        found = []
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if shard.startswith('.tmp-'):
+                shutil.rmtree(shard_dir, ignore_errors=True)
+                continue
+            if not os.path.isdir(shard_dir):
+                continue
+            for key in os.listdir(shard_dir):
+                entry_dir = os.path.join(shard_dir, key)
+                size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+                found.append((os.path.getmtime(entry_dir), key, size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def path(self, key, variant):
+        """File path of a stored variant, or None; marks the entry recently used"""
+        if variant not in VARIANTS:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._touch(key)
+        return os.path.join(self._dir(key), VARIANTS[variant][0])
+
+    def contains(self, key):
+        """Look up a key, marking it recently used"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False
+            self.hits += 1
+            self._touch(key)
+        return True
+
+    def _touch(self, key):
+        """Mark an entry recently used, in the index and on disk (call with _lock held)"""
+        self._entries.move_to_end(key)
+        try:
+            os.utime(self._dir(key))
+        except OSError:
+            pass
+
+    def put(self, key, image, generation_seconds=None):
+        """Store a PIL image and its variants under key, with how long it took to generate"""
+        final_dir = self._dir(key)
+        tmp_dir = os.path.join(self.root, f'.tmp-{uuid.uuid4().hex}')
+        os.makedirs(tmp_dir)
+        try:
+            image.save(os.path.join(tmp_dir, VARIANTS['original'][0]), 'PNG', optimize=True)
+            image.save(os.path.join(tmp_dir, VARIANTS['webp'][0]), 'WEBP', quality=85, method=4)
+            thumb = image.copy()
+            thumb.thumbnail(THUMBNAIL_SIZE)
+            thumb.save(os.path.join(tmp_dir, VARIANTS['thumb'][0]), 'WEBP', quality=80, method=4)
+            with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+                json.dump({'generation_seconds': generation_seconds}, f)
+            size = sum(os.path.getsize(os.path.join(tmp_dir, f)) for f in os.listdir(tmp_dir))
+
+            os.makedirs(os.path.dirname(final_dir), exist_ok=True)
+            with self._lock:
+                if key in self._entries:
+                    # Written concurrently by someone else; same content
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    return
+                os.replace(tmp_dir, final_dir)
+                self._entries[key] = size
+                self._total_bytes += size
+                self._collect_garbage(keep=key)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def generation_seconds(self, key):
+        """Seconds the stored image took to generate, or None if unknown"""
+        try:
+            with open(os.path.join(self._dir(key), META_FILE)) as f:
+                return json.load(f).get('generation_seconds')
+        except (OSError, ValueError):
+            return None
+
+    def _collect_garbage(self, keep):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            del self._entries[key]
+            self._total_bytes -= size
+            self.evictions += 1
+            shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+
+from ids import new_id
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_TIMEOUT = 5
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, user_id, payload, webhook_url=None):
+        self.id = new_id()
+        self.user_id = user_id
+        self.payload = payload
+        self.webhook_url = webhook_url
+        self.status = 'queued'
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0  # bumped on every state change, for event streams
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobQueue:
+    """
+    Bounded background job queue served by a fixed pool of worker threads.
+    A user never has more than per_user_limit jobs running at once; their
+    extra jobs wait while other users' jobs go ahead.
+
+    run(job, report_progress) does the work and returns the result;
+    on_complete(job, result) is called before a job is marked succeeded.
+    Finished jobs are forgotten after retention_seconds.
+    """
+
+    def __init__(self, run, on_complete=None, workers=4, max_queued=100, per_user_limit=1, retention_seconds=3600):
+        self.run = run
+        self.on_complete = on_complete
+        self.max_queued = max_queued
+        self.per_user_limit = per_user_limit
+        self.retention_seconds = retention_seconds
+        self._jobs = {}           # {job_id: Job}
+        self._pending = deque()   # queued Jobs in arrival order
+        self._finished = deque()  # finished Jobs in completion order
+        self._running = {}        # {user_id: running job count}
+        self._cond = threading.Condition()
+        self.completed = 0
+        self.failed = 0
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, user_id, payload, webhook_url=None):
+        with self._cond:
+            self._expire()
+            if len(self._pending) >= self.max_queued:
+                raise QueueFull(f"Job queue is full ({self.max_queued} waiting)")
+            job = Job(user_id, payload, webhook_url)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._cond.notify_all()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def wait_for_change(self, job, seen_version, timeout):
+        """Block until a job changes after seen_version (or timeout); returns its state"""
+        with self._cond:
+            self._cond.wait_for(lambda: job.version != seen_version, timeout)
+            return job.version, job.to_dict()
+
+    def _expire(self):
+        cutoff = time.time() - self.retention_seconds
+        while self._finished and self._finished[0].finished_at < cutoff:
+            del self._jobs[self._finished.popleft().id]
+
+    def _next_job(self):
+        for job in self._pending:
+            if self._running.get(job.user_id, 0) < self.per_user_limit:
+                self._pending.remove(job)
+                return job
+        return None
+
+    def _update(self, job, **changes):
+        with self._cond:
+            for key, value in changes.items():
+                setattr(job, key, value)
+            job.version += 1
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._cond.wait_for(self._next_job)
+                self._running[job.user_id] = self._running.get(job.user_id, 0) + 1
+
+            self._update(job, status='running', started_at=time.time())
+            try:
+                result = self.run(job, lambda progress: self._update(job, progress=progress))
+                if self.on_complete is not None:
+                    self.on_complete(job, result)
+                self._update(job, status='succeeded', progress=100, result=result, finished_at=time.time())
+            except Exception as e:
+                logger.exception("Job %s failed", job.id)
+                self._update(job, status='failed', error=str(e), finished_at=time.time())
+            finally:
+                with self._cond:
+                    if job.status == 'succeeded':
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                    self._finished.append(job)
+                    self._running[job.user_id] -= 1
+                    if not self._running[job.user_id]:
+                        del self._running[job.user_id]
+                    self._cond.notify_all()
+
+            if job.webhook_url:
+                self._notify(job)
+
+    def _notify(self, job):
+        try:
+            requests.post(job.webhook_url, json=job.to_dict(), timeout=WEBHOOK_TIMEOUT)
+        except requests.RequestException:
+            logger.warning("Webhook for job %s failed: %s", job.id, job.webhook_url)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queue_depth': len(self._pending),
+                'running': sum(self._running.values()),
+                'completed': self.completed,
+                'failed': self.failed,
+                'max_queued': self.max_queued,
+                'per_user_limit': self.per_user_limit
+            }
@@ -0,0 +1,129 @@
+import re
+import threading
+from collections import OrderedDict
+
+_WORD = re.compile(r'\w+')
+
+# Words that do not change what gets drawn
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'with', 'and', 'in', 'on', 'at', 'over', 'under',
+    'please', 'image', 'picture', 'photo', 'generate', 'create', 'show', 'me',
+}
+
+
+def normalize_prompt(prompt):
+    """Lowercase, drop filler words and sort tokens: "sunset over ocean" == "Ocean sunset" """
+    tokens = {t for t in _WORD.findall(prompt.lower()) if t not in STOPWORDS}
+    return ' '.join(sorted(tokens))
+
+
+def char_ngrams(text, n=3):
+    padded = f' {text} '
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class PromptCache:
+    """
+    Maps prompts to the stored result of an earlier generation.
+    Lookups first try the normalized (token-sorted) prompt; if a
+    similarity threshold is set, they then fall back to the most similar
+    cached prompt by character n-gram Jaccard similarity, found through an
+    n-gram inverted index. Prompts that normalize to nothing (only filler
+    words) are never cached. Bounded with LRU eviction.
+    """
+
+    def __init__(self, max_entries=10000, similarity_threshold=None, ngram=3):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ngram = ngram
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {normalized prompt: (value, generation seconds, ngrams)}
+        self._index = {}               # {ngram: set of normalized prompts}
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def lookup(self, prompt):
+        """Cached value for a prompt (or a near-duplicate), else None"""
+        key = normalize_prompt(prompt)
+        with self._lock:
+            if not key:
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                self.seconds_saved += entry[1]
+                return entry[0]
+
+            if self.similarity_threshold:
+                match = self._most_similar(key)
+                if match is not None:
+                    entry = self._entries[match]
+                    self._entries.move_to_end(match)
+                    self.similar_hits += 1
+                    self.seconds_saved += entry[1]
+                    return entry[0]
+
+            self.misses += 1
+            return None
+
+    def _most_similar(self, key):
+        grams = char_ngrams(key, self.ngram)
+        shared = {}
+        for gram in grams:
+            for candidate in self._index.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        best, best_score = None, 0.0
+        for candidate, count in shared.items():
+            union = len(grams) + len(self._entries[candidate][2]) - count
+            score = count / union
+            if score > best_score:
+                best, best_score = candidate, score
+        return best if best_score >= self.similarity_threshold else None
+
+    def add(self, prompt, value, generation_seconds):
+        """Remember the result of generating a prompt"""
+        key = normalize_prompt(prompt)
+        if not key:
+            return
+        grams = char_ngrams(key, self.ngram)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, generation_seconds, grams)
+            for gram in grams:
+                self._index.setdefault(gram, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, prompt):
+        with self._lock:
+            key = normalize_prompt(prompt)
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, _, grams = self._entries.pop(key)
+        for gram in grams:
+            keys = self._index[gram]
+            keys.discard(key)
+            if not keys:
+                del self._index[gram]
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'similarity_threshold': self.similarity_threshold,
+                'exact_hits': self.exact_hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+                'generation_seconds_saved': round(self.seconds_saved, 3)
+            }
@@ -140,7 +140,9 @@ async function sendMessage() {
         
         const data = await response.json();
         
-        if (data.type === 'image') {
+        if (data.type === 'image_job') {
+            followImageJob(data.job_id, displayMessage(data.response, 'bot'));
+        } else if (data.type === 'image') {
             displayImageMessage(data.response, data.image_url);
         } else {
             displayMessage(data.response || data.error, 'bot');
@@ -151,6 +153,27 @@ async function sendMessage() {
     }
 }
 
+function followImageJob(jobId, placeholderDiv) {
+    // Progress arrives as Server-Sent Events until the job finishes
+    const events = new EventSource(`${API_URL}/jobs/${jobId}/events`);
+    
+    events.addEventListener('running', (event) => {
+        const job = JSON.parse(event.data);
+        placeholderDiv.textContent = `Generating image... ${job.progress}%`;
+    });
+    events.addEventListener('succeeded', (event) => {
+        const job = JSON.parse(event.data);
+        events.close();
+        placeholderDiv.remove();
+        displayImageMessage(job.result.response, job.result.image_url);
+    });
+    events.addEventListener('failed', (event) => {
+        const job = JSON.parse(event.data);
+        events.close();
+        placeholderDiv.textContent = `Image generation failed: ${job.error}`;
+    });
+}
+
 function displayMessage(text, sender) {
     const messagesDiv = document.getElementById('messages');
     const messageDiv = document.createElement('div');
@@ -165,6 +188,7 @@ function displayMessage(text, sender) {
     
     messagesDiv.appendChild(messageDiv);
     messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    return messageDiv;
 }
 
 function displayImageMessage(text, imageUrl) {
@@ -4,19 +4,73 @@ import os
 import json
 from datetime import datetime
 from collections import defaultdict
-import hashlib
+from array import array
+import logging
+import shutil
+import threading
+
+import numpy as np
+
+from bm25 import BM25Index, ShardIndex
+from corpus_search import CorpusSearcher
+from dedup import ChunkRegistry, chunk_hash
+from embeddings import DenseIndex, load_embedder
+from ids import new_id
+from ingest import (ChunkReader, Indexer, StreamingUploadRequest, discard_incoming, incoming_file,
+                    iter_chunks, iter_sentences)
+from store import DocumentStore, remove_temp_dirs, write_directory
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.request_class = StreamingUploadRequest
 CORS(app)
 
-# In-memory storage for documents and conversations
-documents = {}  # {doc_id: {name, content, chunks, uploaded_at}}
+# Documents and conversations, restored from the store at startup.
+# Documents with the same bytes share one blob (stored file plus index
+# entries), keyed by content hash and kept while any document references it.
+documents = {}  # {doc_id: {name, blob, uploaded_at}}
+blobs = {}  # {content hash: {path, size, chunks, status, progress, refs}}
 conversations = defaultdict(list)  # {doc_id: [{role, content}]}
-doc_counter = 0
+state_lock = threading.Lock()  # guards the above and the order of their log records
+chunk_registry = ChunkRegistry()
 
-# File uploads directory
+# File uploads directory: blob text in documents/, per-blob BM25 shards
+# in shards/, the mutation log and snapshots in store/
 UPLOADS_DIR = 'uploads'
-os.makedirs(UPLOADS_DIR, exist_ok=True)
+DOCUMENTS_DIR = os.path.join(UPLOADS_DIR, 'documents')
+SHARDS_DIR = os.path.join(UPLOADS_DIR, 'shards')
+os.makedirs(DOCUMENTS_DIR, exist_ok=True)
+os.makedirs(SHARDS_DIR, exist_ok=True)
+remove_temp_dirs(SHARDS_DIR)
+app.config['UPLOAD_FOLDER'] = UPLOADS_DIR
+
+# Snapshot after this many logged mutations, or this many seconds
+store = DocumentStore(os.path.join(UPLOADS_DIR, 'store'))
+SNAPSHOT_EVERY = int(os.getenv('SNAPSHOT_EVERY', '1000'))
+SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', '300'))
+snapshot_wanted = threading.Event()
+snapshot_lock = threading.Lock()  # one snapshot at a time
+
+# Chunking: sliding windows of sentences, consecutive chunks sharing some
+CHUNK_SENTENCES = int(os.getenv('CHUNK_SENTENCES', '3'))
+CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '1'))
+
+# Retrieval: BM25 inverted index plus dense vectors from a local embedder
+# ("hashing", "hashing:<dim>" or "sentence-transformers:<model>")
+search_index = BM25Index()
+dense_index = DenseIndex(os.path.join(UPLOADS_DIR, 'embeddings'), load_embedder(os.getenv('EMBEDDER', 'hashing')))
+RETRIEVERS = {'bm25': search_index, 'dense': dense_index}
+DEFAULT_RETRIEVAL = os.getenv('RETRIEVAL_MODE', 'bm25')
+DEFAULT_TOP_K = 3
+MAX_TOP_K = 20
+
+# Corpus-wide queries fan out over the per-blob shards on a thread pool;
+# shards that miss the latency budget (milliseconds) are left out
+corpus_searcher = CorpusSearcher(workers=int(os.getenv('SEARCH_WORKERS', '8')))
+SEARCH_BUDGET_MS = float(os.getenv('SEARCH_BUDGET_MS', '250'))
+MAX_SEARCH_BUDGET_MS = 5000
+CORPUS_CONVERSATION = 'corpus'  # conversations key for corpus-wide chat
 
 # Sample PDF content for demo (simulating PDF extraction)
 SAMPLE_DOCUMENTS = {
@@ -54,78 +108,566 @@ SAMPLE_DOCUMENTS = {
     }
 }
 
+
+def index_key(blob_id):
+    """Shards and embeddings depend on the chunking settings as well as the bytes"""
+    return f"{blob_id}-{CHUNK_SENTENCES}-{CHUNK_OVERLAP}"
+
+
+def shard_dir(blob_id):
+    return os.path.join(SHARDS_DIR, index_key(blob_id))
+
+
+def index_blob(blob, report_progress):
+    """Chunk a stored blob and add it to both indexes, reusing a saved shard if there is one"""
+    key = blob['id']
+    directory = shard_dir(key)
+    try:
+        if os.path.isdir(directory):
+            chunks = ChunkReader.load(blob['path'], directory)
+            if key not in search_index:
+                search_index.register(key, ShardIndex.load(directory))
+            hashes = np.load(os.path.join(directory, 'chunk_hashes.npy'))
+        else:
+            chunks, hashes = build_shard(blob, directory, report_progress)
+        blob['chunks'] = chunks
+        dense_index.add(key, chunks, key=index_key(key),
+                        report_progress=lambda fraction: report_progress(50 + int(fraction * 50)),
+                        reuse=stored_vector)
+        chunk_registry.add_blob(key, hashes)
+    finally:
+        with state_lock:
+            blob['indexed'] = True
+            orphaned = not blob['refs']
+        if orphaned:  # every document was deleted while indexing
+            release_blob(blob)
+
+
+def build_shard(blob, directory, report_progress):
+    """Chunk a blob, build its BM25 shard and save it (with chunk offsets and hashes) to directory"""
+    chunks = ChunkReader(blob['path'])
+    blob['chunks'] = chunks
+    hashes = array('q')
+    size = max(blob['size'], 1)
+    read = 0
+
+    def on_block(block):
+        nonlocal read
+        read += len(block)
+        report_progress(int(read / size * 50))
+
+    def chunk_texts(f):
+        for span in iter_chunks(iter_sentences(f, on_block=on_block), CHUNK_SENTENCES, CHUNK_OVERLAP):
+            chunks.append(span)
+            hashes.append(chunk_hash(span.text))
+            yield span.text
+
+    with open(blob['path'], 'rb') as f:
+        shard = ShardIndex.build(chunk_texts(f))
+
+    def write(tmp):
+        shard.save(tmp)
+        chunks.save(tmp)
+        np.save(os.path.join(tmp, 'chunk_hashes.npy'), np.frombuffer(hashes, dtype=np.int64))
+    write_directory(directory, write)
+    search_index.register(blob['id'], shard)
+    return chunks, hashes
+
+
+def stored_vector(text):
+    """Embedding of an identical chunk already stored for another blob"""
+    home = chunk_registry.lookup(chunk_hash(text))
+    return dense_index.vector(*home) if home else None
+
+
+def release_blob(blob):
+    """
+    Drop a blob nothing references any more from the indexes. Its text
+    and shard stay on disk until a snapshot no longer needs them (see
+    collect_garbage).
+    """
+    with state_lock:
+        if blob['refs'] or blobs.get(blob['id']) is not blob:
+            return
+        del blobs[blob['id']]
+        # Still under the lock, so a re-upload of the same bytes cannot
+        # recreate the blob before its entries are gone
+        search_index.remove(blob['id'])
+        dense_index.remove(blob['id'])
+        chunk_registry.remove_blob(blob['id'])
+
+
+indexer = Indexer(index_blob, workers=int(os.getenv('INDEX_WORKERS', '1')))
+
+
+def store_upload(name, incoming):
+    """
+    Register an uploaded file (a closed HashingFile) as a document.
+    New content becomes a blob under DOCUMENTS_DIR; known content is
+    shared with the documents that already hold it, and the same content
+    under the same name is the existing document. Returns (doc, blob,
+    whether the blob is new and needs indexing).
+    """
+    key = incoming.digest.hexdigest()
+    with state_lock:
+        blob = blobs.get(key)
+        if blob is not None:
+            for doc_id in blob['refs']:
+                if documents[doc_id]['name'] == name:
+                    return documents[doc_id], blob, False
+        created = blob is None
+        if created:
+            path = os.path.join(DOCUMENTS_DIR, f'{key}.txt')
+            os.replace(incoming.name, path)
+            blob = blobs[key] = {
+                'id': key,
+                'path': path,
+                'size': os.path.getsize(path),
+                'chunks': ChunkReader(path),
+                'status': 'queued',
+                'progress': 0,
+                'refs': set()
+            }
+        doc_id = f"doc_{new_id()}"
+        blob['refs'].add(doc_id)
+        documents[doc_id] = {
+            'id': doc_id,
+            'name': name,
+            'blob': key,
+            'uploaded_at': datetime.now().isoformat()
+        }
+        log({'op': 'add', 'doc': documents[doc_id]})
+        return documents[doc_id], blob, created
+
+
+def add_document(name, content):
+    """Store and index a document given as text, on the calling thread"""
+    with incoming_file(UPLOADS_DIR) as f:
+        f.write(content.encode('utf-8'))
+    try:
+        doc, blob, created = store_upload(name, f)
+    finally:
+        discard_incoming(f)
+    if created:
+        indexer.run(blob)
+    return doc, blob, created
+
+
+def document_summary(doc):
+    blob = blobs[doc['blob']]
+    summary = {
+        'id': doc['id'],
+        'name': doc['name'],
+        'chunks': len(blob['chunks']),
+        'size': blob['size'],
+        'content_hash': blob['id'],
+        'status': blob['status'],
+        'progress': blob['progress'],
+        'uploaded_at': doc['uploaded_at']
+    }
+    if blob.get('error'):
+        summary['error'] = blob['error']
+    return summary
+
+
+def parse_date(value):
+    """
+    Naive local datetime from an ISO date or date-time, or None for an
+    empty value. Values with an offset (or "Z") are converted to local
+    time, which is how uploaded_at is stored.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith(('Z', 'z')) else value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def select_blobs(name=None, uploaded_after=None, uploaded_before=None):
+    """
+    Ready blobs with the documents that pass the filters, in upload
+    order: {blob id: [doc, ...]}. name matches case-insensitively
+    anywhere in the document name; the dates bound uploaded_at
+    (after inclusive, before exclusive).
+    """
+    name = name.lower() if name else None
+    selected = defaultdict(list)
+    with state_lock:
+        for doc in documents.values():
+            blob = blobs.get(doc['blob'])
+            if blob is None or blob['status'] != 'ready':
+                continue
+            if name and name not in doc['name'].lower():
+                continue
+            uploaded_at = datetime.fromisoformat(doc['uploaded_at'])
+            if uploaded_after and uploaded_at < uploaded_after:
+                continue
+            if uploaded_before and uploaded_at >= uploaded_before:
+                continue
+            selected[blob['id']].append(doc)
+    return selected
+
+
+def search_corpus(query, top_k, retrieval, budget_ms, merge=False, **filters):
+    """
+    Top-k chunks across every selected document, each cited as
+    {doc_id, doc_name, chunk, score, text}, plus the fan-out report
+    (shards searched, timed out, partial, latency). With merge, a
+    document's overlapping or adjoining chunks are cited once as one
+    passage, which also lists its "chunks" and has their best score.
+    """
+    selected = select_blobs(**filters)
+    hits, report = corpus_searcher.search(
+        RETRIEVERS[retrieval], list(selected), query, top_k, budget_ms / 1000)
+    if merge:
+        passages = merge_hits(hits)
+    else:
+        passages = [(score, blob_id, [idx], chunk_text(blob_id, idx)) for score, blob_id, idx in hits]
+    citations = []
+    for score, blob_id, idxs, text in passages:
+        docs = selected[blob_id]
+        citation = {
+            'doc_id': docs[0]['id'],
+            'doc_name': docs[0]['name'],
+            'chunk': idxs[0],
+            'score': round(score, 4),
+            'text': text
+        }
+        if merge:
+            citation['chunks'] = idxs
+        if len(docs) > 1:  # same content uploaded under other names
+            citation['also_in'] = [{'doc_id': doc['id'], 'doc_name': doc['name']} for doc in docs[1:]]
+        citations.append(citation)
+    return citations, report
+
+
+def merge_hits(hits):
+    """
+    Corpus hits (score, blob id, chunk) as passages (best score, blob id,
+    chunks, text): a blob's overlapping or adjoining hit chunks are read
+    as one passage. Passages keep the order of their best hit.
+    """
+    by_blob = {}
+    for rank, (score, blob_id, idx) in enumerate(hits):
+        by_blob.setdefault(blob_id, []).append((rank, score, idx))
+    passages = []
+    for blob_id, blob_hits in by_blob.items():
+        blob = blobs.get(blob_id)
+        try:
+            chunks = blob['chunks']
+            spans = [(positions, chunks.read(start, end))
+                     for start, end, positions in chunks.merged_spans([idx for _, _, idx in blob_hits])]
+        except (TypeError, OSError, IndexError):  # released and collected since it was searched
+            spans = [([position], '') for position in range(len(blob_hits))]
+        for positions, text in spans:
+            members = [blob_hits[p] for p in positions]
+            passages.append((min(rank for rank, _, _ in members), max(score for _, score, _ in members),
+                             blob_id, sorted(idx for _, _, idx in members), text))
+    passages.sort(key=lambda passage: passage[0])
+    return [passage[1:] for passage in passages]
+
+
+def chunk_text(blob_id, idx):
+    blob = blobs.get(blob_id)
+    try:
+        return blob['chunks'][idx] if blob is not None else ''
+    except (OSError, IndexError):  # released and collected since it was searched
+        return ''
+
+
+def corpus_request(data):
+    """Validated search_corpus() arguments from a request body"""
+    budget_ms = float(data.get('budget_ms', SEARCH_BUDGET_MS))
+    return {
+        'top_k': max(1, min(int(data.get('top_k', DEFAULT_TOP_K)), MAX_TOP_K)),
+        'retrieval': data.get('retrieval', DEFAULT_RETRIEVAL),
+        'budget_ms': max(1.0, min(budget_ms, MAX_SEARCH_BUDGET_MS)),
+        'name': data.get('name'),
+        'uploaded_after': parse_date(data.get('uploaded_after')),
+        'uploaded_before': parse_date(data.get('uploaded_before'))
+    }
+
+
+def log(record, sync=True):
+    """Append a mutation to the store's log (call with state_lock held)"""
+    store.append(record, sync=sync)
+    if store.records_since_snapshot >= SNAPSHOT_EVERY:
+        snapshot_wanted.set()
+
+
+def take_snapshot():
+    """
+    Write a snapshot: documents and conversations as of a new log
+    generation, plus the corpus BM25 statistics and the shards they
+    cover. Then delete blob files nothing refers to any more.
+    """
+    with snapshot_lock:
+        with state_lock:
+            gen = store.begin_snapshot()
+            manifest = {
+                'documents': dict(documents),
+                'conversations': {doc_id: list(messages) for doc_id, messages in conversations.items() if messages}
+            }
+        blob_ids, terms, counts, chunks, total_length = search_index.snapshot()
+        manifest['index'] = {
+            'chunking': [CHUNK_SENTENCES, CHUNK_OVERLAP],
+            'blobs': blob_ids,
+            'chunks': chunks,
+            'total_length': int(total_length)
+        }
+        store.commit_snapshot(gen, manifest, {'df_terms': terms, 'df_counts': counts})
+        collect_garbage(keep=set(blob_ids))
+        return gen
+
+
+def collect_garbage(keep):
+    """Delete blob text and shards that neither a live blob nor the current snapshot uses"""
+    with state_lock:
+        keep = keep | set(blobs)
+        for name in os.listdir(DOCUMENTS_DIR):
+            if name.split('.', 1)[0] not in keep:
+                os.remove(os.path.join(DOCUMENTS_DIR, name))
+        for name in os.listdir(SHARDS_DIR):
+            if not name.startswith('.tmp-') and name.split('-', 1)[0] not in keep:
+                shutil.rmtree(os.path.join(SHARDS_DIR, name), ignore_errors=True)
+
+
+def snapshot_loop():
+    while True:
+        snapshot_wanted.wait(SNAPSHOT_INTERVAL)
+        snapshot_wanted.clear()
+        if store.records_since_snapshot:
+            try:
+                take_snapshot()
+            except Exception:
+                logger.exception("Snapshot failed")
+
+
+def restore():
+    """
+    Rebuild state at startup: documents and conversations from the last
+    snapshot plus the log records after it; BM25 statistics memory-mapped
+    from the snapshot, with shards mapped lazily. Only blobs missing a
+    saved shard or embedding matrix are queued for indexing.
+    """
+    manifest, directory, records = store.load()
+    snapshot_blobs = set()
+    if manifest is not None:
+        documents.update(manifest['documents'])
+        conversations.update(manifest['conversations'])
+        index = manifest['index']
+        if index['chunking'] == [CHUNK_SENTENCES, CHUNK_OVERLAP]:
+            snapshot_blobs = set(index['blobs'])
+            search_index.set_base(
+                np.load(os.path.join(directory, 'df_terms.npy'), mmap_mode='r'),
+                np.load(os.path.join(directory, 'df_counts.npy'), mmap_mode='r'),
+                index['chunks'], index['total_length'],
+                {key: shard_dir(key) for key in snapshot_blobs}
+            )
+
+    for record in records:
+        if record['op'] == 'add':
+            documents[record['doc']['id']] = record['doc']
+        elif record['op'] == 'delete':
+            documents.pop(record['doc_id'], None)
+            conversations.pop(record['doc_id'], None)
+        elif record['op'] == 'chat' and (record['doc_id'] in documents or record['doc_id'] == CORPUS_CONVERSATION):
+            conversations[record['doc_id']].extend(record['messages'])
+
+    refs = defaultdict(set)
+    for doc in documents.values():
+        refs[doc['blob']].add(doc['id'])
+    for key in snapshot_blobs - set(refs):  # deleted since the snapshot
+        search_index.remove(key)
+
+    for key, doc_ids in refs.items():
+        path = os.path.join(DOCUMENTS_DIR, f'{key}.txt')
+        if not os.path.exists(path):
+            logger.error("Blob %s is missing; dropping documents %s", key, sorted(doc_ids))
+            for doc_id in doc_ids:
+                documents.pop(doc_id)
+                conversations.pop(doc_id, None)
+            continue
+        blob = blobs[key] = {
+            'id': key,
+            'path': path,
+            'size': os.path.getsize(path),
+            'chunks': ChunkReader(path),
+            'status': 'queued',
+            'progress': 0,
+            'refs': doc_ids
+        }
+        directory = shard_dir(key)
+        if key in snapshot_blobs and dense_index.attach(key, index_key(key)):
+            blob.update(chunks=ChunkReader.load(path, directory), status='ready', progress=100, indexed=True)
+            chunk_registry.defer_blob(
+                key, lambda directory=directory: np.load(os.path.join(directory, 'chunk_hashes.npy'), mmap_mode='r'))
+        else:
+            indexer.submit(blob)
+
+
+restore()
+threading.Thread(target=snapshot_loop, daemon=True).start()
+
+
+@app.teardown_request
+def remove_unclaimed_uploads(exc):
+    discard_incoming(request)
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """Simulate PDF upload and document loading"""
-    global doc_counter
+    """
+    Upload a document. multipart/form-data ("file", optional "name") is
+    streamed to disk and indexed in the background (202; poll
+    GET /api/documents/<doc_id> for progress). A JSON body with "content"
+    is indexed before responding.
+    """
     try:
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None or not upload.filename:
+                return jsonify({"error": "No file provided"}), 400
+            doc_name = request.form.get('name') or upload.filename
+            upload.stream.close()
+            doc, blob, created = store_upload(doc_name, upload.stream)
+            if created:
+                indexer.submit(blob)
+            return jsonify({
+                "status": "accepted" if created else "duplicate",
+                "doc_id": doc['id'],
+                "name": doc_name,
+                "status_url": f"/api/documents/{doc['id']}"
+            }), 202 if created else 200
+
         data = request.json
-        doc_name = data.get('name', f'Document {doc_counter}')
+        doc_name = data.get('name', f'Document {len(documents) + 1}')
         doc_content = data.get('content', '')
         
         if not doc_content:
             return jsonify({"error": "No content provided"}), 400
         
-        doc_counter += 1
-        doc_id = f"doc_{doc_counter}"
-        
-        # Chunk content by sentences
-        chunks = [s.strip() for s in doc_content.split('.') if s.strip()]
-        
-        documents[doc_id] = {
-            'id': doc_id,
-            'name': doc_name,
-            'content': doc_content,
-            'chunks': chunks,
-            'uploaded_at': datetime.now().isoformat()
-        }
+        doc, blob, created = add_document(doc_name, doc_content)
+        if blob['status'] == 'failed':
+            return jsonify({"error": blob.get('error', 'Indexing failed')}), 500
         
         return jsonify({
-            "status": "success",
-            "doc_id": doc_id,
+            "status": "success" if created else "duplicate",
+            "doc_id": doc['id'],
             "name": doc_name,
-            "chunks": len(chunks)
+            "chunks": len(blob['chunks'])
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/chat', methods=['POST'])
 def chat_with_document():
-    """Chat about uploaded documents using simulated RAG"""
+    """
+    Chat about an uploaded document using simulated RAG, or about every
+    document with "scope": "corpus" (see search_documents for filters)
+    """
     try:
         data = request.json
         message = data.get('message', '')
         doc_id = data.get('doc_id', '')
+        if data.get('scope') == 'corpus':
+            return chat_with_corpus(message, corpus_request(data))
+        top_k = max(1, min(int(data.get('top_k', DEFAULT_TOP_K)), MAX_TOP_K))
+        retrieval = data.get('retrieval', DEFAULT_RETRIEVAL)
         
         if not doc_id or doc_id not in documents:
             return jsonify({"error": "Document not found"}), 400
+        if retrieval not in RETRIEVERS:
+            return jsonify({"error": f"retrieval must be one of {', '.join(RETRIEVERS)}"}), 400
         
         doc = documents[doc_id]
+        blob = blobs[doc['blob']]
+        if blob['status'] != 'ready':
+            return jsonify({"error": "Document is still being indexed"}), 409
         
-        # Simple semantic matching: find chunks containing message keywords
-        keywords = message.lower().split()
-        relevant_chunks = []
-        
-        for chunk in doc['chunks']:
-            chunk_lower = chunk.lower()
-            if any(keyword in chunk_lower for keyword in keywords):
-                relevant_chunks.append(chunk)
-        
-        # Use first 3 relevant chunks as context
-        context = '. '.join(relevant_chunks[:3]) if relevant_chunks else doc['chunks'][0]
+        # Rank the document's chunks and use the top-k as context; hits
+        # that overlap or adjoin in the file are read as one passage, so
+        # sentences the sliding windows share are not repeated
+        hits = RETRIEVERS[retrieval].search(blob['id'], message, k=top_k)
+        chunks = blob['chunks']
+        relevant_chunks = [chunks.read(start, end) for start, end, _ in chunks.merged_spans([idx for _, idx in hits])]
+        if relevant_chunks:
+            context = ' '.join(relevant_chunks)
+        else:
+            context = chunks[0] if len(chunks) else 'the document is empty'
         
         # Build response
-        response = f"About '{message}': Based on {doc['name']}, {context}. This simulates RAG retrieval augmented generation with retrieved context from the document."
+        response = f"About '{message}': Based on {doc['name']}, {context} This simulates RAG retrieval augmented generation with retrieved context from the document."
         
         # Store conversation
-        conversations[doc_id].append({"role": "user", "content": message})
-        conversations[doc_id].append({"role": "assistant", "content": response})
+        exchange = [{"role": "user", "content": message}, {"role": "assistant", "content": response}]
+        with state_lock:
+            if doc_id in documents:
+                conversations[doc_id].extend(exchange)
+                log({'op': 'chat', 'doc_id': doc_id, 'messages': exchange}, sync=False)
         
         return jsonify({
             "response": response,
             "context_chunks": len(relevant_chunks),
+            "scores": [round(score, 4) for score, _ in hits],
+            "retrieval": retrieval,
             "doc_name": doc['name']
         })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def chat_with_corpus(message, params):
+    if params['retrieval'] not in RETRIEVERS:
+        return jsonify({"error": f"retrieval must be one of {', '.join(RETRIEVERS)}"}), 400
+    # Sliding-window chunks share sentences: quote each passage once
+    citations, report = search_corpus(message, merge=True, **params)
+    if citations:
+        context = ' '.join(f"{c['text']} [{i}]" for i, c in enumerate(citations, 1))
+        sources = '\n'.join(
+            f"[{i}] {c['doc_name']}, chunk{'s' if len(c['chunks']) > 1 else ''} {', '.join(map(str, c['chunks']))}"
+            for i, c in enumerate(citations, 1))
+        response = f"About '{message}': {context} This simulates RAG retrieval augmented generation with retrieved context from your documents.\n\nSources:\n{sources}"
+    else:
+        response = f"About '{message}': no matching passages were found in {report['answered']} searched documents."
+
+    exchange = [{"role": "user", "content": message}, {"role": "assistant", "content": response}]
+    with state_lock:
+        conversations[CORPUS_CONVERSATION].extend(exchange)
+        log({'op': 'chat', 'doc_id': CORPUS_CONVERSATION, 'messages': exchange}, sync=False)
+
+    return jsonify({
+        "response": response,
+        "context_chunks": len(citations),
+        "citations": citations,
+        "retrieval": params['retrieval'],
+        "search": report
+    })
+
+@app.route('/api/search', methods=['POST'])
+def search_documents():
+    """
+    Rank chunks across all ready documents. Optional filters: "name"
+    (substring of the document name), "uploaded_after"/"uploaded_before"
+    (ISO dates); "budget_ms" caps the time spent waiting on shards, after
+    which the results found so far are returned with "partial": true.
+    """
+    try:
+        data = request.json
+        query = data.get('query', '')
+        if not query:
+            return jsonify({"error": "No query provided"}), 400
+        params = corpus_request(data)
+        if params['retrieval'] not in RETRIEVERS:
+            return jsonify({"error": f"retrieval must be one of {', '.join(RETRIEVERS)}"}), 400
+        citations, report = search_corpus(query, **params)
+        return jsonify({"results": citations, "retrieval": params['retrieval'], **report})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -134,15 +676,7 @@ def list_documents():
     """List all uploaded documents"""
     try:
         return jsonify({
-            "documents": [
-                {
-                    'id': doc['id'],
-                    'name': doc['name'],
-                    'chunks': len(doc['chunks']),
-                    'uploaded_at': doc['uploaded_at']
-                }
-                for doc in documents.values()
-            ]
+            "documents": [document_summary(doc) for doc in list(documents.values())]
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -150,39 +684,72 @@ def list_documents():
 @app.route('/api/documents/sample', methods=['POST'])
 def load_sample_documents():
     """Load sample documents for demo"""
-    global doc_counter
     try:
         loaded = []
         for filename, doc_data in SAMPLE_DOCUMENTS.items():
-            doc_counter += 1
-            doc_id = f"doc_{doc_counter}"
-            chunks = [s.strip() for s in doc_data['content'].split('.') if s.strip()]
-            documents[doc_id] = {
-                'id': doc_id,
-                'name': doc_data['name'],
-                'content': doc_data['content'],
-                'chunks': chunks,
-                'uploaded_at': datetime.now().isoformat()
-            }
-            loaded.append({'id': doc_id, 'name': doc_data['name']})
+            doc, _, _ = add_document(doc_data['name'], doc_data['content'])
+            loaded.append({'id': doc['id'], 'name': doc['name']})
         
         return jsonify({"status": "success", "documents": loaded})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/documents/<doc_id>', methods=['GET'])
+def get_document(doc_id):
+    """Document details, including indexing status and progress"""
+    doc = documents.get(doc_id)
+    if doc is None:
+        return jsonify({"error": "Document not found"}), 404
+    return jsonify(document_summary(doc))
+
 @app.route('/api/documents/<doc_id>', methods=['DELETE'])
 def delete_document(doc_id):
     """Delete a document"""
     try:
-        if doc_id in documents:
-            del documents[doc_id]
-            if doc_id in conversations:
-                del conversations[doc_id]
+        with state_lock:
+            doc = documents.pop(doc_id, None)
+            if doc is not None:
+                conversations.pop(doc_id, None)
+                log({'op': 'delete', 'doc_id': doc_id})
+                blob = blobs[doc['blob']]
+                blob['refs'].discard(doc_id)
+                # A blob still being indexed is released by its indexer
+                release = not blob['refs'] and blob.get('indexed')
+        if doc is not None:
+            if release:
+                release_blob(blob)
             return jsonify({"status": "deleted"})
         return jsonify({"error": "Document not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/index/snapshot', methods=['POST'])
+def snapshot_index():
+    """Write a snapshot now"""
+    try:
+        return jsonify({"status": "success", "snapshot": take_snapshot()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/index/stats', methods=['GET'])
+def index_stats():
+    """Retrieval index sizes"""
+    with state_lock:
+        storage = {
+            'documents': len(documents),
+            'blobs': len(blobs),
+            'blob_bytes': sum(blob['size'] for blob in blobs.values())
+        }
+    return jsonify({
+        'bm25': search_index.stats(),
+        'dense': dense_index.stats(),
+        'indexer': indexer.stats(),
+        'storage': storage,
+        'chunks': chunk_registry.stats(),
+        'store': store.stats(),
+        'corpus_search': corpus_searcher.stats()
+    })
+
 if __name__ == '__main__':
     app.run(debug=False, port=5006, use_reloader=False)
 
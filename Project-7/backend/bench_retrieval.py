@@ -0,0 +1,117 @@
+"""
+Benchmark: BM25 inverted index and memory-mapped dense vectors vs the
+previous linear substring scan, over a synthetic corpus of 100k chunks
+(1,000 documents x 100 chunks) with a Zipf-like vocabulary.
+
+Run: python bench_retrieval.py [chunks]
+"""
+import itertools
+import random
+import string
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bm25 import BM25Index
+from embeddings import DenseIndex, HashingEmbedder, top_k
+
+CHUNKS_PER_DOC = 100
+QUERIES = 200
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def make_corpus(n_chunks, rng):
+    words = vocabulary(20000, rng)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    docs = {}
+    for d in range(n_chunks // CHUNKS_PER_DOC):
+        docs[f'doc_{d}'] = [
+            ' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(8, 20)))
+            for _ in range(CHUNKS_PER_DOC)
+        ]
+    return docs, words
+
+
+def legacy_search(chunks, message):
+    keywords = message.lower().split()
+    relevant = [c for c in chunks if any(k in c.lower() for k in keywords)]
+    return relevant[:3]
+
+
+if __name__ == '__main__':
+    n_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(0)
+    docs, words = make_corpus(n_chunks, rng)
+    queries = [' '.join(rng.sample(words[:5000], 3)) for _ in range(QUERIES)]
+    print(f"corpus: {len(docs)} documents, {n_chunks} chunks")
+
+    index = BM25Index()
+    start = time.perf_counter()
+    for doc_id, chunks in docs.items():
+        index.add(doc_id, chunks)
+    print(f"index build:          {time.perf_counter() - start:8.2f} s   {index.stats()}")
+
+    # Per-document queries, as /api/chat issues them
+    doc_ids = list(docs)
+    targets = [rng.choice(doc_ids) for _ in queries]
+    start = time.perf_counter()
+    for doc_id, query in zip(targets, queries):
+        legacy_search(docs[doc_id], query)
+    legacy = (time.perf_counter() - start) / QUERIES
+    start = time.perf_counter()
+    for doc_id, query in zip(targets, queries):
+        index.search(doc_id, query, k=3)
+    bm25 = (time.perf_counter() - start) / QUERIES
+    print(f"per-document query    scan: {legacy * 1e3:8.3f} ms   bm25: {bm25 * 1e3:8.3f} ms")
+
+    # The same query against every document: the whole 100k-chunk corpus
+    sample = queries[:10]
+    start = time.perf_counter()
+    for query in sample:
+        for chunks in docs.values():
+            legacy_search(chunks, query)
+    legacy = (time.perf_counter() - start) / len(sample)
+    start = time.perf_counter()
+    for query in sample:
+        for doc_id in doc_ids:
+            index.search(doc_id, query, k=3)
+    bm25 = (time.perf_counter() - start) / len(sample)
+    print(f"whole-corpus query    scan: {legacy * 1e3:8.1f} ms   bm25: {bm25 * 1e3:8.1f} ms")
+
+    # Incremental maintenance
+    start = time.perf_counter()
+    index.remove(doc_ids[0])
+    index.add(doc_ids[0], docs[doc_ids[0]])
+    print(f"remove + re-add doc:  {(time.perf_counter() - start) * 1e3:8.2f} ms")
+
+    # Dense vectors: embed at upload, one mat-vec + argpartition per query
+    with tempfile.TemporaryDirectory() as root:
+        dense = DenseIndex(root, HashingEmbedder())
+        start = time.perf_counter()
+        for doc_id, chunks in docs.items():
+            dense.add(doc_id, chunks)
+        print(f"dense build:          {time.perf_counter() - start:8.2f} s   "
+              f"{dense.stats()['bytes'] / 2**20:.0f} MiB on disk")
+        start = time.perf_counter()
+        for doc_id, query in zip(targets, queries):
+            dense.search(doc_id, query, k=3)
+        print(f"per-document query   dense: {(time.perf_counter() - start) / QUERIES * 1e3:8.3f} ms")
+
+        # Whole corpus in one contiguous matrix
+        path = f'{root}/corpus.npy'
+        np.save(path, np.concatenate([dense._matrix(dense._docs[d]) for d in doc_ids]))
+        matrix = np.load(path, mmap_mode='r')
+        vectors = dense.embedder.embed(queries)
+        start = time.perf_counter()
+        for vector in vectors:
+            top_k(matrix @ vector, 3)
+        print(f"whole-corpus query   dense: {(time.perf_counter() - start) / QUERIES * 1e3:8.1f} ms   "
+              f"({len(matrix)} x {matrix.shape[1]} float32, memory-mapped)")
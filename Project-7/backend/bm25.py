@@ -0,0 +1,261 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+
+import numpy as np
+
+# Runs of Unicode letters and digits: \w without the underscore
+_WORD = re.compile(r'[^\W_]+')
+
+# Words that carry no retrieval signal
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for',
+    'from', 'has', 'have', 'how', 'in', 'into', 'is', 'it', 'its', 'me', 'of',
+    'on', 'or', 'tell', 'that', 'the', 'this', 'to', 'was', 'what', 'when',
+    'where', 'which', 'who', 'why', 'with', 'about', 'explain',
+}
+
+
+def tokenize(text):
+    """Lowercased word tokens without stopwords or single characters"""
+    return [t for t in _WORD.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def term_hash(term):
+    """Terms are stored as 64-bit hashes so index files are plain int arrays"""
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+def top_k(scores, k):
+    """Top-k (score, index) pairs of a score vector, best first"""
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    order = candidates[np.argsort(-scores[candidates])]
+    return [(float(scores[i]), int(i)) for i in order]
+
+
+class ShardIndex:
+    """
+    Inverted index over the chunks of one document, as flat arrays:
+    sorted term hashes, a pointer per term into the (chunk index, term
+    frequency) postings, and token counts per chunk. Built in memory, or
+    memory-mapped from a directory written by save().
+    """
+
+    FILES = ('terms', 'pointers', 'postings', 'lengths')
+
+    def __init__(self, terms, pointers, postings, lengths, total_length):
+        self.terms = terms
+        self.pointers = pointers
+        self.postings = postings
+        self.lengths = lengths
+        self.total_length = total_length
+
+    @classmethod
+    def build(cls, chunks):
+        postings = {}  # {term: array of chunk index, term frequency pairs}
+        lengths = array('i')
+        for idx, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                pairs = postings.get(term)
+                if pairs is None:
+                    pairs = postings[term] = array('i')
+                pairs.append(idx)
+                pairs.append(tf)
+
+        hashed = sorted((term_hash(term), pairs) for term, pairs in postings.items())
+        flat = array('i')
+        pointers = np.zeros(len(hashed) + 1, dtype=np.int64)
+        for i, (_, pairs) in enumerate(hashed):
+            flat.extend(pairs)
+            pointers[i + 1] = len(flat) // 2
+        return cls(
+            np.array([h for h, _ in hashed], dtype=np.int64),
+            pointers,
+            np.frombuffer(flat, dtype=np.int32).reshape(-1, 2),
+            np.frombuffer(lengths, dtype=np.int32),
+            sum(lengths)
+        )
+
+    @classmethod
+    def load(cls, directory):
+        arrays = [np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in cls.FILES]
+        with open(os.path.join(directory, 'shard.json')) as f:
+            meta = json.load(f)
+        return cls(*arrays, meta['total_length'])
+
+    def save(self, directory):
+        for name in self.FILES:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'shard.json'), 'w') as f:
+            json.dump({'chunks': len(self), 'total_length': int(self.total_length)}, f)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def document_frequencies(self):
+        """(term hashes, number of chunks containing each)"""
+        return self.terms, np.diff(self.pointers)
+
+    def search(self, weights, k, avgdl, k1, b):
+        """Top-k (score, chunk index) for {term hash: idf} query weights"""
+        matched, contributions = [], []
+        for h, idf in weights.items():
+            i = int(np.searchsorted(self.terms, h))
+            if i == len(self.terms) or self.terms[i] != h:
+                continue
+            postings = self.postings[self.pointers[i]:self.pointers[i + 1]]
+            idx = postings[:, 0]
+            tf = postings[:, 1].astype(np.float64)
+            denom = tf + k1 * (1 - b + b * self.lengths[idx] / avgdl)
+            matched.append(idx)
+            contributions.append(idf * tf * (k1 + 1) / denom)
+        if not matched:
+            return []
+        if len(matched) == 1:
+            chunks, scores = matched[0], contributions[0]
+        else:
+            chunks, inverse = np.unique(np.concatenate(matched), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(contributions))
+        return [(score, int(chunks[i])) for score, i in top_k(scores, k)]
+
+
+class BM25Index:
+    """
+    BM25 ranking over per-document index shards. Each document's chunks
+    are tokenized once when it is added; corpus-wide statistics (chunk
+    count, average chunk length, document frequency per term) are kept
+    up to date as documents come and go, so scores from different
+    documents are comparable. A query only touches the postings of its
+    own terms.
+
+    Document frequencies are a base table (memory-mapped from a snapshot,
+    see set_base/snapshot) plus in-memory changes since. Shards restored
+    from a snapshot are attached by directory and only mapped when first
+    searched.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._shards = {}  # {doc_id: ShardIndex, or directory of one not loaded yet}
+        self._base_terms = np.zeros(0, dtype=np.int64)
+        self._base_counts = np.zeros(0, dtype=np.int64)
+        self._df = Counter()  # {term hash: change since the base table}
+        self._chunks = 0
+        self._total_length = 0
+
+    def add(self, doc_id, chunks):
+        return self.register(doc_id, ShardIndex.build(chunks))
+
+    def register(self, doc_id, shard):
+        """Add a built (or loaded) shard and its statistics"""
+        terms, counts = shard.document_frequencies()
+        with self._lock:
+            if doc_id in self._shards:
+                self._remove(doc_id)
+            self._shards[doc_id] = shard
+            self._df.update(dict(zip(terms.tolist(), counts.tolist())))
+            self._chunks += len(shard)
+            self._total_length += shard.total_length
+        return shard
+
+    def set_base(self, terms, counts, chunks, total_length, shard_dirs):
+        """Start from snapshot statistics covering the shards in {doc_id: directory}"""
+        with self._lock:
+            self._base_terms = terms
+            self._base_counts = counts
+            self._chunks = chunks
+            self._total_length = total_length
+            self._shards.update(shard_dirs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._shards
+
+    def remove(self, doc_id):
+        with self._lock:
+            if doc_id in self._shards:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        shard = self._shard(doc_id)
+        del self._shards[doc_id]
+        terms, counts = shard.document_frequencies()
+        terms = terms.tolist()
+        self._df.subtract(dict(zip(terms, counts.tolist())))
+        for h in terms:
+            if not self._df[h]:
+                del self._df[h]
+        self._chunks -= len(shard)
+        self._total_length -= shard.total_length
+
+    def _shard(self, doc_id):
+        shard = self._shards.get(doc_id)
+        if isinstance(shard, str):
+            shard = self._shards[doc_id] = ShardIndex.load(shard)
+        return shard
+
+    def _document_frequency(self, h):
+        df = self._df.get(h, 0)
+        i = int(np.searchsorted(self._base_terms, h))
+        if i < len(self._base_terms) and self._base_terms[i] == h:
+            df += int(self._base_counts[i])
+        return df
+
+    def _weights(self, query):
+        n = self._chunks
+        weights = {}
+        for h in {term_hash(term) for term in tokenize(query)}:
+            df = self._document_frequency(h)
+            if df > 0:
+                weights[h] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        return weights
+
+    def search(self, doc_id, query, k=3):
+        """Top-k (score, chunk index) of a document's chunks for a query"""
+        with self._lock:
+            shard = self._shard(doc_id)
+            if shard is None:
+                return []
+            weights = self._weights(query)
+            avgdl = self._total_length / self._chunks if self._chunks else 1.0
+        if not weights:
+            return []
+        return shard.search(weights, k, max(avgdl, 1.0), self.k1, self.b)
+
+    def snapshot(self):
+        """
+        Corpus statistics for a snapshot: (doc_ids, term hashes, document
+        frequencies, chunk count, total length), with changes folded into
+        the base table.
+        """
+        with self._lock:
+            doc_ids = list(self._shards)
+            base_terms, base_counts = self._base_terms, self._base_counts
+            changes = dict(self._df)
+            chunks, total_length = self._chunks, self._total_length
+        terms = np.concatenate([base_terms, np.fromiter(changes.keys(), np.int64, len(changes))])
+        counts = np.concatenate([base_counts, np.fromiter(changes.values(), np.int64, len(changes))])
+        terms, inverse = np.unique(terms, return_inverse=True)
+        counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        keep = counts > 0
+        return doc_ids, terms[keep], counts[keep], chunks, total_length
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documents': len(self._shards),
+                'loaded_shards': sum(not isinstance(shard, str) for shard in self._shards.values()),
+                'chunks': self._chunks,
+                'avg_chunk_tokens': round(self._total_length / self._chunks, 2) if self._chunks else 0.0
+            }
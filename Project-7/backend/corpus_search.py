@@ -0,0 +1,60 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class CorpusSearcher:
+    """
+    Scatter/gather search across many per-document shards. Each shard is
+    searched on a worker thread for its own top-k; the sorted per-shard
+    lists are merged with a heap into the global top-k. Shards that have
+    not answered when the latency budget runs out are left behind and
+    the answer is marked partial.
+    """
+
+    def __init__(self, workers=8):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='corpus-search')
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.partial = 0
+
+    def search(self, retriever, shard_ids, query, k, budget_seconds):
+        """
+        Top-k (score, shard id, chunk index) over shard_ids with
+        retriever.search(shard_id, query, k), plus a report of how many
+        shards answered within budget_seconds.
+        """
+        start = time.perf_counter()
+        futures = {self._pool.submit(retriever.search, shard_id, query, k): shard_id for shard_id in shard_ids}
+        done, pending = wait(futures, timeout=budget_seconds)
+        for future in pending:
+            future.cancel()  # shards already running finish in the background and are ignored
+
+        ranked, failed = [], 0
+        for future in done:
+            if future.exception() is not None:
+                failed += 1
+                continue
+            shard_id = futures[future]
+            ranked.append([(score, shard_id, idx) for score, idx in future.result()])
+        merged = heapq.merge(*ranked, key=lambda hit: -hit[0])
+        hits = list(itertools.islice(merged, k))
+
+        with self._lock:
+            self.queries += 1
+            if pending:
+                self.partial += 1
+        return hits, {
+            'shards': len(futures),
+            'answered': len(done) - failed,
+            'failed': failed,
+            'timed_out': len(pending),
+            'partial': bool(pending or failed),
+            'latency_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    def stats(self):
+        with self._lock:
+            return {'queries': self.queries, 'partial': self.partial}
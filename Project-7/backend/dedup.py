@@ -0,0 +1,89 @@
+import hashlib
+import threading
+from array import array
+
+
+def chunk_hash(text):
+    """64-bit content hash of a chunk's text"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+class ChunkRegistry:
+    """
+    Reference-counted table of chunk contents across all stored blobs
+    (unique document contents). Each distinct chunk text is counted once
+    per occurrence and remembers, for every blob holding it, one row
+    where its embedding already lives, so identical chunks in other
+    documents are copied rather than embedded again. When a blob goes its
+    chunks stay findable through the other blobs holding them; a chunk is
+    forgotten when its last reference goes.
+
+    Blobs restored at startup are deferred with a loader for their hashes
+    and only counted in when the table is first needed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chunks = {}    # {chunk hash: [references, {blob key: row}]}
+        self._blobs = {}     # {blob key: array of chunk hashes, by row}
+        self._deferred = {}  # {blob key: callable returning its chunk hashes}
+
+    def _load_deferred(self):
+        while self._deferred:
+            blob_key, load = self._deferred.popitem()
+            self._add(blob_key, load())
+
+    def lookup(self, h):
+        """(blob key, row) of an existing copy of a chunk, or None"""
+        with self._lock:
+            self._load_deferred()
+            entry = self._chunks.get(h)
+            if entry is None:
+                return None
+            return next(iter(entry[1].items()))
+
+    def defer_blob(self, blob_key, load_hashes):
+        with self._lock:
+            if blob_key not in self._blobs:
+                self._deferred[blob_key] = load_hashes
+
+    def add_blob(self, blob_key, hashes):
+        with self._lock:
+            self._deferred.pop(blob_key, None)
+            self._add(blob_key, hashes)
+
+    def _add(self, blob_key, hashes):
+        if blob_key in self._blobs:
+            return
+        self._blobs[blob_key] = array('q', hashes)
+        for row, h in enumerate(self._blobs[blob_key]):
+            entry = self._chunks.get(h)
+            if entry is None:
+                self._chunks[h] = [1, {blob_key: row}]
+            else:
+                entry[0] += 1
+                entry[1].setdefault(blob_key, row)
+
+    def remove_blob(self, blob_key):
+        with self._lock:
+            if self._deferred.pop(blob_key, None) is not None:
+                return
+            hashes = self._blobs.pop(blob_key, ())
+            for h in hashes:
+                entry = self._chunks[h]
+                entry[0] -= 1
+                if not entry[0]:
+                    del self._chunks[h]
+                else:
+                    entry[1].pop(blob_key, None)
+
+    def stats(self):
+        with self._lock:
+            self._load_deferred()
+            references = sum(entry[0] for entry in self._chunks.values())
+            return {
+                'blobs': len(self._blobs),
+                'chunk_references': references,
+                'unique_chunks': len(self._chunks),
+                'shared_references': references - len(self._chunks)
+            }
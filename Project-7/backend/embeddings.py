@@ -0,0 +1,245 @@
+import hashlib
+import os
+import threading
+import uuid
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from bm25 import tokenize, top_k
+
+EMBED_BATCH_SIZE = 1024
+
+
+class HashingEmbedder:
+    """
+    Local embedder using the hashing trick: every token is hashed to a
+    signed bucket of a fixed-size vector. Deterministic across processes
+    and restarts, needs no model download or network.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f'hashing-{dim}'
+
+        @lru_cache(maxsize=1 << 16)
+        def bucket(token):
+            h = zlib.crc32(token.encode('utf-8'))
+            return h % dim, 1.0 if h & 0x80000000 else -1.0
+        self._bucket = bucket
+
+    def embed(self, texts):
+        """L2-normalized float32 matrix, one row per text"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                col, sign = self._bucket(token)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+        np.add.at(matrix, (rows, cols), signs)
+        return normalize(matrix)
+
+
+class SentenceTransformerEmbedder:
+    """Embedder backed by a local sentence-transformers model"""
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name.replace('/', '_')}"
+
+    def embed(self, texts):
+        matrix = self._model.encode(list(texts), convert_to_numpy=True)
+        return normalize(matrix.astype(np.float32))
+
+
+def normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def load_embedder(spec):
+    """Embedder from a spec: "hashing", "hashing:<dim>" or "sentence-transformers:<model>" """
+    kind, _, arg = spec.partition(':')
+    if kind == 'hashing':
+        return HashingEmbedder(int(arg) if arg else 512)
+    if kind == 'sentence-transformers':
+        return SentenceTransformerEmbedder(arg or 'all-MiniLM-L6-v2')
+    raise ValueError(f"Unknown embedder: {spec}")
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DenseIndex:
+    """
+    Dense-vector retrieval. Each document's chunk embeddings are one
+    contiguous float32 matrix saved as <root>/<embedder>/<key>.npy and
+    memory-mapped read-only, so a cold start touches no vectors until
+    they are queried and worker processes share the same page cache.
+    Files are keyed by a hash of the chunk text: re-uploading the same
+    content reuses the existing matrix instead of embedding it again.
+    A query is a single matrix-vector product plus argpartition.
+    """
+
+    def __init__(self, root, embedder):
+        self.embedder = embedder
+        self.root = os.path.join(root, embedder.name)
+        self._lock = threading.Lock()
+        self._docs = {}      # {doc_id: key}
+        self._matrices = {}  # {key: memory-mapped matrix}
+        self.reused = 0         # documents whose matrix already existed
+        self.reused_chunks = 0  # chunk vectors copied instead of embedded
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, f'{key}.npy')
+
+    @staticmethod
+    def content_key(chunks):
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def add(self, doc_id, chunks, key=None, report_progress=None, reuse=None):
+        """
+        Embed a document's chunks (any sized iterable of text). Rows are
+        embedded in batches and appended to the .npy file, so the whole
+        matrix is never held in memory. reuse(text) may return an already
+        computed vector for a chunk, which is then not embedded again.
+        """
+        key = key or self.content_key(chunks)
+        path = self._path(key)
+        with self._lock:
+            exists = os.path.exists(path)
+            if exists:
+                self.reused += 1
+                self._docs[doc_id] = key
+        if exists:
+            return
+
+        tmp_path = os.path.join(self.root, f'.tmp-{uuid.uuid4().hex}.npy')
+        try:
+            self._write(tmp_path, chunks, report_progress, reuse)
+            with self._lock:
+                # Files are created and deleted under the lock, so a concurrent
+                # remove() cannot delete a matrix this document is about to share
+                os.replace(tmp_path, path)
+                self._docs[doc_id] = key
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _write(self, path, chunks, report_progress, reuse):
+        rows, dim = len(chunks), self.embedder.dim
+        header = {'descr': np.lib.format.dtype_to_descr(np.dtype(np.float32)), 'fortran_order': False, 'shape': (rows, dim)}
+        written = 0
+        with open(path, 'wb') as f:
+            np.lib.format.write_array_header_1_0(f, header)
+            for batch in _batches(chunks, EMBED_BATCH_SIZE):
+                f.write(self._embed_batch(batch, reuse).tobytes())
+                written += len(batch)
+                if report_progress is not None:
+                    report_progress(written / rows)
+        if written != rows:
+            raise ValueError(f"Expected {rows} chunks, got {written}")
+
+    def attach(self, doc_id, key):
+        """Map a document to an existing matrix file; False if there is none"""
+        with self._lock:
+            if not os.path.exists(self._path(key)):
+                return False
+            self._docs[doc_id] = key
+            return True
+
+    def _embed_batch(self, texts, reuse):
+        if reuse is None:
+            return np.ascontiguousarray(self.embedder.embed(texts), dtype=np.float32)
+        vectors = np.empty((len(texts), self.embedder.dim), dtype=np.float32)
+        missing = []
+        for i, text in enumerate(texts):
+            vector = reuse(text)
+            if vector is None:
+                missing.append(i)
+            else:
+                vectors[i] = vector
+        if missing:
+            vectors[missing] = self.embedder.embed([texts[i] for i in missing])
+        with self._lock:
+            self.reused_chunks += len(texts) - len(missing)
+        return vectors
+
+    def vector(self, doc_id, row):
+        """A stored chunk embedding, or None if it is gone"""
+        key = self._docs.get(doc_id)
+        if key is None:
+            return None
+        try:
+            return self._matrix(key)[row]
+        except (FileNotFoundError, IndexError):
+            return None
+
+    def remove(self, doc_id):
+        with self._lock:
+            key = self._docs.pop(doc_id, None)
+            if key is None or key in self._docs.values():
+                return
+            self._matrices.pop(key, None)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _matrix(self, key):
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            try:
+                matrix = np.load(self._path(key), mmap_mode='r')
+            except ValueError:  # zero-row matrices cannot be mapped
+                matrix = np.load(self._path(key))
+            with self._lock:
+                matrix = self._matrices.setdefault(key, matrix)
+        return matrix
+
+    def search(self, doc_id, query, k=3):
+        """Top-k (cosine similarity, chunk index) of a document's chunks"""
+        key = self._docs.get(doc_id)
+        if key is None:
+            return []
+        try:
+            matrix = self._matrix(key)
+        except FileNotFoundError:  # removed concurrently
+            return []
+        if not len(matrix):
+            return []
+        scores = matrix @ self.embedder.embed([query])[0]
+        return [(score, idx) for score, idx in top_k(scores, k) if score > 0]
+
+    def stats(self):
+        with self._lock:
+            keys = set(self._docs.values())
+            return {
+                'embedder': self.embedder.name,
+                'dim': self.embedder.dim,
+                'documents': len(self._docs),
+                'matrices': len(keys),
+                'mapped': len(self._matrices),
+                'bytes': sum(os.path.getsize(self._path(key)) for key in keys if os.path.exists(self._path(key))),
+                'reused': self.reused,
+                'reused_chunks': self.reused_chunks
+            }
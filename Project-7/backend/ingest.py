@@ -0,0 +1,307 @@
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import uuid
+from array import array
+from collections import namedtuple
+
+import numpy as np
+from flask import Request, current_app
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+MAX_SENTENCE_BYTES = 2048
+# Chunks further apart than this are never merged, however blank the gap
+MAX_MERGE_GAP = 4096
+
+# End of a sentence: terminal punctuation before whitespace, or a blank line
+_SENTENCE_END = re.compile(rb'[.!?]+(?=\s)|\n[ \t\r\f\v]*\n')
+
+Span = namedtuple('Span', 'start end text')  # byte offsets into the file plus text
+
+
+class HashingFile:
+    """Writable file that keeps a SHA-256 of everything written to it"""
+
+    def __init__(self, path):
+        self.name = path
+        self.digest = hashlib.sha256()
+        self._file = open(path, 'w+b')
+
+    def write(self, data):
+        self.digest.update(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+def incoming_file(upload_folder):
+    return HashingFile(os.path.join(upload_folder, f'.incoming-{uuid.uuid4().hex}'))
+
+
+class StreamingUploadRequest(Request):
+    """
+    Request whose multipart file parts are written straight into the
+    app's UPLOAD_FOLDER as the bytes arrive (and hashed on the way),
+    instead of being spooled to memory or a temp file elsewhere. Files
+    the view does not move into place are deleted at teardown (see
+    discard_incoming).
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        f = incoming_file(current_app.config['UPLOAD_FOLDER'])
+        if not hasattr(self, 'incoming_paths'):
+            self.incoming_paths = []
+        self.incoming_paths.append(f.name)
+        return f
+
+
+def discard_incoming(owner):
+    """Delete an incoming file, or a request's uploaded files, unless they were claimed"""
+    paths = [owner.name] if isinstance(owner, HashingFile) else getattr(owner, 'incoming_paths', ())
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _span(start, raw):
+    stripped = raw.lstrip()
+    start += len(raw) - len(stripped)
+    stripped = stripped.rstrip()
+    if not stripped:
+        return None
+    return Span(start, start + len(stripped), ' '.join(stripped.decode('utf-8', 'replace').split()))
+
+
+def _cut(buf, limit):
+    """Where to force-split an over-long sentence: last space, else a UTF-8 boundary"""
+    cut = buf.rfind(b' ', 0, limit)
+    if cut > 0:
+        return cut
+    while limit > 0 and buf[limit] & 0xC0 == 0x80:
+        limit -= 1
+    return limit or len(buf)
+
+
+def iter_sentences(stream, block_size=BLOCK_SIZE, max_bytes=MAX_SENTENCE_BYTES, on_block=None):
+    """
+    Sentences of a UTF-8 byte stream, read block by block. Only the
+    current unfinished sentence is buffered, never the whole text.
+    on_block(block) sees every block read, e.g. to hash or track progress.
+    """
+    buf = b''
+    offset = 0  # file offset of buf[0]
+    while True:
+        block = stream.read(block_size)
+        if on_block is not None:
+            on_block(block)
+        buf += block
+        pos = 0
+        for match in _SENTENCE_END.finditer(buf):
+            span = _span(offset + pos, buf[pos:match.end()])
+            if span:
+                yield span
+            pos = match.end()
+        while len(buf) - pos > max_bytes:
+            cut = pos + _cut(buf[pos:], max_bytes)
+            span = _span(offset + pos, buf[pos:cut])
+            if span:
+                yield span
+            pos = cut
+        buf = buf[pos:]
+        offset += pos
+        if not block:
+            span = _span(offset, buf)
+            if span:
+                yield span
+            return
+
+
+def iter_chunks(sentences, window=3, overlap=1):
+    """Sliding windows of `window` sentences, consecutive windows sharing `overlap`"""
+    stride = max(1, window - overlap)
+    pending = []
+    emitted = False
+    for sentence in sentences:
+        pending.append(sentence)
+        if len(pending) >= window:
+            yield _join(pending)
+            emitted = True
+            pending = pending[stride:]
+    if pending and (not emitted or len(pending) > window - stride):
+        yield _join(pending)
+
+
+def _join(sentences):
+    return Span(sentences[0].start, sentences[-1].end, ' '.join(s.text for s in sentences))
+
+
+class ChunkReader:
+    """
+    A document's chunks as a sequence backed by the file on disk: only
+    the byte offsets of each chunk are held in memory, and text is read
+    back on access. Offsets saved with save() are memory-mapped by load()
+    the first time they are needed.
+    """
+
+    def __init__(self, path, offsets_path=None):
+        self.path = path
+        self._offsets_path = offsets_path
+        self._starts = array('q')
+        self._ends = array('q')
+
+    @classmethod
+    def load(cls, path, directory):
+        return cls(path, os.path.join(directory, 'offsets.npy'))
+
+    def save(self, directory):
+        offsets = np.empty((len(self), 2), dtype=np.int64)
+        offsets[:, 0] = self.starts
+        offsets[:, 1] = self.ends
+        np.save(os.path.join(directory, 'offsets.npy'), offsets)
+
+    def _load(self):
+        if self._offsets_path is not None:
+            try:
+                offsets = np.load(self._offsets_path, mmap_mode='r')
+            except ValueError:  # zero-row arrays cannot be mapped on older numpy
+                offsets = np.load(self._offsets_path)
+            self._starts, self._ends = offsets[:, 0], offsets[:, 1]
+            self._offsets_path = None
+
+    @property
+    def starts(self):
+        self._load()
+        return self._starts
+
+    @property
+    def ends(self):
+        self._load()
+        return self._ends
+
+    def append(self, span):
+        self._starts.append(span.start)
+        self._ends.append(span.end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, idx):
+        return self.read(int(self.starts[idx]), int(self.ends[idx]))
+
+    def read(self, start, end):
+        """Text of the byte range [start, end) of the file"""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            raw = f.read(end - start)
+        return ' '.join(raw.decode('utf-8', 'replace').split())
+
+    def merged_spans(self, indices):
+        """
+        (start, end, positions) byte ranges covering the chunks at
+        `indices`, with chunks that overlap or are separated only by a
+        short run of whitespace merged into one range, so text they share
+        is read once. positions lists where the range's chunks are in
+        `indices`; ranges come in the order of their first one.
+        """
+        spans = sorted((int(self.starts[i]), int(self.ends[i]), position) for position, i in enumerate(indices))
+        merged = []  # [start, end, positions]
+        with open(self.path, 'rb') as f:
+            for start, end, position in spans:
+                gap = start - merged[-1][1] if merged else None
+                if gap is None or gap > MAX_MERGE_GAP:
+                    touching = False
+                elif gap <= 0:
+                    touching = True
+                else:
+                    f.seek(merged[-1][1])
+                    touching = not f.read(gap).strip()
+                if touching:
+                    merged[-1][1] = max(merged[-1][1], end)
+                    merged[-1][2].append(position)
+                else:
+                    merged.append([start, end, [position]])
+        return sorted(((start, end, sorted(positions)) for start, end, positions in merged), key=lambda span: span[2][0])
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            for start, end in zip(self.starts, self.ends):
+                f.seek(int(start))
+                yield ' '.join(f.read(int(end - start)).decode('utf-8', 'replace').split())
+
+
+class Indexer:
+    """
+    Background indexing: documents are queued and indexed by worker
+    threads with index(doc, report_progress). A document's 'status' goes
+    queued -> indexing -> ready (or failed) and 'progress' runs 0-100.
+    """
+
+    def __init__(self, index, workers=1):
+        self.index = index
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.indexing = 0
+        self.completed = 0
+        self.failed = 0
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, doc):
+        doc['status'] = 'queued'
+        doc['progress'] = 0
+        self._queue.put(doc)
+
+    def run(self, doc):
+        """Index a document on the calling thread"""
+        doc['status'] = 'indexing'
+
+        def report_progress(progress):
+            doc['progress'] = progress
+        try:
+            self.index(doc, report_progress)
+        except Exception as e:
+            logger.exception("Indexing %s failed", doc['id'])
+            doc['status'] = 'failed'
+            doc['error'] = str(e)
+            with self._lock:
+                self.failed += 1
+            return False
+        doc['status'] = 'ready'
+        doc['progress'] = 100
+        with self._lock:
+            self.completed += 1
+        return True
+
+    def _worker(self):
+        while True:
+            doc = self._queue.get()
+            with self._lock:
+                self.indexing += 1
+            try:
+                self.run(doc)
+            finally:
+                with self._lock:
+                    self.indexing -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'indexing': self.indexing,
+                'completed': self.completed,
+                'failed': self.failed
+            }
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import uuid
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WAL_NAME = re.compile(r'^wal-(\d+)\.log$')
+
+
+def fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_directory(final, write):
+    """
+    Create a directory atomically: write(tmp_dir) fills a temp directory,
+    whose files are fsynced before it is renamed into place. Readers see
+    either nothing or the complete directory. Returns False if the
+    directory already existed (its content is left untouched).
+    """
+    parent = os.path.dirname(final)
+    tmp = os.path.join(parent, f'.tmp-{uuid.uuid4().hex}')
+    os.makedirs(tmp)
+    try:
+        write(tmp)
+        for name in os.listdir(tmp):
+            with open(os.path.join(tmp, name), 'rb+') as f:
+                os.fsync(f.fileno())
+        fsync_dir(tmp)
+        if os.path.isdir(final):
+            return False
+        os.rename(tmp, final)
+        fsync_dir(parent)
+        return True
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def remove_temp_dirs(root):
+    """Clear out temp directories left by writes that never finished"""
+    for name in os.listdir(root):
+        if name.startswith('.tmp-'):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+class DocumentStore:
+    """
+    Durable state as a write-ahead log plus periodic snapshots:
+
+        <root>/CURRENT          generation of the live snapshot
+        <root>/snapshot-<gen>/  manifest.json and .npy arrays
+        <root>/wal-<gen>.log    records appended after snapshot <gen> began
+
+    Each log record is one line "<crc32> <json>"; a torn or corrupt tail
+    is dropped on load. A snapshot is written to a temp directory and
+    renamed into place, and only then does CURRENT (itself replaced
+    atomically) point at it, so a crash mid-snapshot leaves the previous
+    snapshot and its logs in charge.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._wal = None
+        self._wal_gen = 0
+        self.records_since_snapshot = 0
+        self.snapshots = 0
+        os.makedirs(root, exist_ok=True)
+        remove_temp_dirs(root)
+
+    def _current(self):
+        try:
+            with open(os.path.join(self.root, 'CURRENT')) as f:
+                return int(f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def snapshot_dir(self, gen):
+        return os.path.join(self.root, f'snapshot-{gen}')
+
+    def _wal_gens(self):
+        gens = []
+        for name in os.listdir(self.root):
+            match = _WAL_NAME.match(name)
+            if match:
+                gens.append(int(match.group(1)))
+        return sorted(gens)
+
+    def _wal_path(self, gen):
+        return os.path.join(self.root, f'wal-{gen}.log')
+
+    def load(self):
+        """
+        Open the store: returns (manifest, snapshot directory, log records
+        to replay on top of it). manifest and directory are None before
+        the first snapshot.
+        """
+        gen = self._current()
+        manifest, directory = None, None
+        if gen is not None:
+            directory = self.snapshot_dir(gen)
+            with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+
+        records = []
+        wal_gens = [g for g in self._wal_gens() if gen is None or g >= gen]
+        for g in wal_gens:
+            records.extend(self._read_wal(self._wal_path(g)))
+        self.records_since_snapshot = len(records)
+
+        self._wal_gen = wal_gens[-1] if wal_gens else (gen or 0)
+        self._wal = open(self._wal_path(self._wal_gen), 'a', encoding='utf-8')
+        return manifest, directory, records
+
+    def _read_wal(self, path):
+        records, good = [], 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    crc, payload = line.rstrip(b'\n').split(b' ', 1)
+                    if not line.endswith(b'\n') or int(crc, 16) != zlib.crc32(payload):
+                        raise ValueError("checksum mismatch")
+                    records.append(json.loads(payload))
+                except ValueError:
+                    logger.warning("Dropping corrupt log tail of %s at byte %d", path, good)
+                    break
+                good += len(line)
+        if good != os.path.getsize(path):
+            with open(path, 'rb+') as f:
+                f.truncate(good)
+        return records
+
+    def append(self, record, sync=True):
+        """Log a mutation; with sync, it is on disk when this returns"""
+        payload = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        line = f"{zlib.crc32(payload.encode('utf-8')):08x} {payload}\n"
+        with self._lock:
+            self._wal.write(line)
+            self._wal.flush()
+            if sync:
+                os.fsync(self._wal.fileno())
+            self.records_since_snapshot += 1
+
+    def begin_snapshot(self):
+        """
+        Start a new log generation. Call while holding whatever lock
+        guards the state being captured, so every later record lands in
+        the new log. Returns the generation for commit_snapshot().
+        """
+        with self._lock:
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+            self._wal.close()
+            self._wal_gen += 1
+            self._wal = open(self._wal_path(self._wal_gen), 'a', encoding='utf-8')
+            self.records_since_snapshot = 0
+            return self._wal_gen
+
+    def commit_snapshot(self, gen, manifest, arrays):
+        """Write snapshot <gen> (manifest plus {name: ndarray}) and make it current"""
+        def write(tmp):
+            with open(os.path.join(tmp, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp, f'{name}.npy'), array)
+        write_directory(self.snapshot_dir(gen), write)
+
+        tmp_current = os.path.join(self.root, f'.CURRENT-{uuid.uuid4().hex}')
+        with open(tmp_current, 'w') as f:
+            f.write(str(gen))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_current, os.path.join(self.root, 'CURRENT'))
+        fsync_dir(self.root)
+
+        # Older snapshots and the logs they needed are now obsolete
+        for name in os.listdir(self.root):
+            match = _WAL_NAME.match(name)
+            if match and int(match.group(1)) < gen:
+                os.remove(os.path.join(self.root, name))
+            elif name.startswith('snapshot-') and name != f'snapshot-{gen}':
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        with self._lock:
+            self.snapshots += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'snapshot': self._current(),
+                'wal_generation': self._wal_gen,
+                'records_since_snapshot': self.records_since_snapshot,
+                'snapshots_written': self.snapshots
+            }
@@ -1,6 +1,7 @@
 const API_URL = 'http://localhost:5006/api';
 const md = window.markdownit();
 let selectedDocument = null;
+const ALL_DOCUMENTS = 'all';  // selection that chats across the whole library
 let documents = [];
 
 async function loadSampleDocuments() {
@@ -21,6 +22,54 @@ async function loadSampleDocuments() {
     }
 }
 
+async function uploadFile(input) {
+    const file = input.files[0];
+    if (!file) return;
+    input.value = '';
+    
+    const formData = new FormData();
+    formData.append('file', file);
+    
+    try {
+        const response = await fetch(`${API_URL}/upload`, {
+            method: 'POST',
+            body: formData
+        });
+        
+        const data = await response.json();
+        if (response.ok) {
+            await loadDocuments();
+            pollIndexing(data.doc_id);
+        } else {
+            alert('Error uploading file: ' + data.error);
+        }
+    } catch (error) {
+        alert('Error: ' + error);
+        console.error('Error:', error);
+    }
+}
+
+async function pollIndexing(docId) {
+    // Refresh the list until the document has been indexed
+    const response = await fetch(`${API_URL}/documents/${docId}`);
+    if (!response.ok) return;
+    const doc = await response.json();
+    await loadDocuments();
+    if (doc.status === 'queued' || doc.status === 'indexing') {
+        setTimeout(() => pollIndexing(docId), 1000);
+    }
+}
+
+function documentInfo(doc) {
+    if (doc.status === 'queued' || doc.status === 'indexing') {
+        return `Indexing… ${doc.progress}%`;
+    }
+    if (doc.status === 'failed') {
+        return `Indexing failed: ${doc.error}`;
+    }
+    return `${doc.chunks} chunks`;
+}
+
 async function loadDocuments() {
     try {
         const response = await fetch(`${API_URL}/documents`);
@@ -41,7 +90,7 @@ async function loadDocuments() {
                 div.innerHTML = `
                     <div>
                         <div class="doc-name" onclick="selectDocument('${doc.id}')" style="cursor: pointer;">${doc.name}</div>
-                        <div class="doc-info">${doc.chunks} chunks</div>
+                        <div class="doc-info">${documentInfo(doc)}</div>
                     </div>
                     <button class="delete-btn" onclick="deleteDocument('${doc.id}')">Delete</button>
                 `;
@@ -65,7 +114,9 @@ function selectDocument(docId) {
 
 function updateSelectedDocDisplay() {
     const docDiv = document.getElementById('selectedDoc');
-    if (selectedDocument) {
+    if (selectedDocument === ALL_DOCUMENTS) {
+        docDiv.textContent = '📚 All documents';
+    } else if (selectedDocument) {
         const doc = documents.find(d => d.id === selectedDocument);
         docDiv.textContent = `📖 ${doc ? doc.name : 'Unknown'}`;
     } else {
@@ -115,10 +166,9 @@ async function sendMessage() {
         const response = await fetch(`${API_URL}/chat`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                message: message,
-                doc_id: selectedDocument
-            })
+            body: JSON.stringify(selectedDocument === ALL_DOCUMENTS
+                ? { message: message, scope: 'corpus' }
+                : { message: message, doc_id: selectedDocument })
         });
         
         const data = await response.json();
@@ -1,12 +1,19 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from datetime import datetime
 import json
+import os
+import sqlite3
+
+from database import Database, ReadersBusy
+from pagination import ResultPage, decode_cursor, encode_cursor, page_sql, query_fingerprint
+from plan_cache import Plan, PlanCache, QuestionNormalizer, render_sql
+from result_cache import CachedResult, ResultCache, replay, tables_in
 
 app = Flask(__name__)
 CORS(app)
 
-# Mock database - simulating different tables
+# Seed data for an empty database - the demo tables
 MOCK_DATABASE = {
     'customers': [
         {'id': 1, 'name': 'Alice Johnson', 'email': 'alice@company.com', 'country': 'USA', 'signup_date': '2024-01-15'},
@@ -22,6 +29,27 @@ MOCK_DATABASE = {
     ]
 }
 
+# Embedded SQLite database behind /api/query. An empty database is loaded
+# from DATA_DIR/<table>.csv when DATA_DIR is set, otherwise from MOCK_DATABASE.
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'analytics.db')
+DATA_DIR = os.getenv('DATA_DIR')
+db = Database(DATABASE_PATH, readers=int(os.getenv('DB_READERS', '4')),
+              reader_timeout=float(os.getenv('DB_READER_TIMEOUT', '5')))
+
+
+def seed_database():
+    if not db.is_empty():
+        return
+    for table, rows in MOCK_DATABASE.items():
+        csv_path = os.path.join(DATA_DIR, f'{table}.csv') if DATA_DIR else None
+        if csv_path and os.path.exists(csv_path):
+            db.load_csv(table, csv_path)
+        else:
+            db.load(table, rows)
+
+
+seed_database()
+
 # Sample queries mapping
 QUERY_SAMPLES = {
     'all_customers': {'table': 'customers', 'description': 'Get all customers'},
@@ -31,78 +59,205 @@ QUERY_SAMPLES = {
     'customer_orders': {'table': 'orders', 'join': 'customers', 'description': 'Orders with customer details'},
 }
 
-def process_natural_language_query(query_text):
-    """Simulate NL to SQL conversion and query execution"""
-    query_lower = query_text.lower()
+# Results are read from a server-side cursor a page at a time; a page
+# stops at its row limit or at MAX_PAGE_BYTES of JSON
+DEFAULT_PAGE_ROWS = 1000
+MAX_PAGE_ROWS = int(os.getenv('MAX_PAGE_ROWS', '50000'))
+MAX_PAGE_BYTES = int(os.getenv('MAX_PAGE_BYTES', str(8 * 1024 * 1024)))
+
+# Result pages by SQL and parameters, dropped when a table they read is
+# written; bounded by RESULT_CACHE_BYTES of row JSON
+result_cache = ResultCache(max_bytes=int(os.getenv('RESULT_CACHE_BYTES', str(64 * 1024 * 1024))))
+db.on_write(result_cache.invalidate)
+
+# NL-to-SQL plans by question shape ("orders over <amount>"), so a
+# repeated shape with new literals skips translation
+plan_cache = PlanCache(max_entries=int(os.getenv('PLAN_CACHE_SIZE', '1024')))
+COUNTRY_ALIASES = {'america': 'USA', 'united states': 'USA', 'britain': 'UK', 'united kingdom': 'UK'}
+_normalizer = (None, None)  # (schema version, QuestionNormalizer for that version's data)
+_tables = (None, frozenset())  # (schema version, table names)
+
+
+def question_normalizer(version):
+    """Normalizer knowing the countries in the database; rebuilt when the schema version changes"""
+    global _normalizer
+    if _normalizer[0] != version:
+        countries = {country: country for country in db.distinct('customers', 'country')}
+        countries.update((alias, country) for alias, country in COUNTRY_ALIASES.items() if country in countries)
+        _normalizer = (version, QuestionNormalizer({'country': countries}))
+    return _normalizer[1]
+
+
+def forget_countries(table):
+    """New customers may bring new countries: rebuild the normalizer on next use"""
+    global _normalizer
+    if table == 'customers':
+        _normalizer = (None, None)
+
+
+db.on_write(forget_countries)
+
+
+def table_names(version):
+    global _tables
+    if _tables[0] != version:
+        _tables = (version, frozenset(db.schema()))
+    return _tables[1]
+
+
+def open_page(sql, params, limit, version):
+    """
+    A ResultPage for a page query, replayed from the result cache when
+    it is there; otherwise read from the database and cached once fully
+    read. Returns (page, whether it came from the cache).
+    """
+    key_params = {**params, '_schema': version}
+    cached = result_cache.get(sql, key_params)
+    if cached is not None:
+        return ResultPage(replay(cached), limit, MAX_PAGE_BYTES), True
+    
+    tables = tables_in(sql, table_names(version))
+    generation = result_cache.generation(tables)
+    
+    def store(page):
+        result = CachedResult(page.columns, page.fetched, page.bytes)
+        result_cache.put(sql, key_params, tables, generation, result)
+    return ResultPage(db.stream(sql, params), limit, MAX_PAGE_BYTES, on_complete=store), False
+
+
+def translate(shape):
+    """Simulate NL to SQL conversion of a question shape into a parameterized plan"""
+    words = set(shape.split())
     
     # Keyword matching for different query types
-    if 'customer' in query_lower and ('all' in query_lower or 'list' in query_lower):
-        return {
-            'sql': 'SELECT * FROM customers;',
-            'results': MOCK_DATABASE['customers'],
-            'row_count': len(MOCK_DATABASE['customers'])
-        }
-    elif 'usa' in query_lower or ('customer' in query_lower and 'america' in query_lower):
-        usa_customers = [c for c in MOCK_DATABASE['customers'] if c['country'] == 'USA']
-        return {
-            'sql': 'SELECT * FROM customers WHERE country = "USA";',
-            'results': usa_customers,
-            'row_count': len(usa_customers)
-        }
-    elif 'order' in query_lower and ('all' in query_lower or 'list' in query_lower):
-        return {
-            'sql': 'SELECT * FROM orders;',
-            'results': MOCK_DATABASE['orders'],
-            'row_count': len(MOCK_DATABASE['orders'])
-        }
-    elif 'high' in query_lower and 'order' in query_lower:
-        high_orders = [o for o in MOCK_DATABASE['orders'] if o['amount'] > 100]
-        return {
-            'sql': 'SELECT * FROM orders WHERE amount > 100;',
-            'results': high_orders,
-            'row_count': len(high_orders)
-        }
-    elif 'total' in query_lower and ('order' in query_lower or 'count' in query_lower):
-        return {
-            'sql': 'SELECT COUNT(*) as total_orders FROM orders;',
-            'results': [{'total_orders': len(MOCK_DATABASE['orders'])}],
-            'row_count': 1
-        }
-    elif 'alice' in query_lower or 'customer' in query_lower and 'detail' in query_lower:
-        alice = [c for c in MOCK_DATABASE['customers'] if c['name'].lower() == 'alice johnson']
-        alice_orders = [o for o in MOCK_DATABASE['orders'] if o['customer_id'] == 1]
-        return {
-            'sql': 'SELECT c.*, o.* FROM customers c JOIN orders o ON c.id = o.customer_id WHERE c.name = "Alice Johnson";',
-            'results': {'customer': alice, 'orders': alice_orders},
-            'row_count': len(alice_orders)
-        }
+    if '<country>' in words:
+        return Plan('SELECT * FROM customers WHERE country = :country;', {}, None, 'id')
+    elif 'customer' in shape and ('all' in shape or 'list' in shape):
+        return Plan('SELECT * FROM customers;', {}, None, 'id')
+    elif 'order' in shape and '<amount>' in words:
+        return Plan('SELECT * FROM orders WHERE amount > :amount;', {}, None, 'id')
+    elif 'order' in shape and ('all' in shape or 'list' in shape):
+        return Plan('SELECT * FROM orders;', {}, None, 'id')
+    elif 'high' in shape and 'order' in shape:
+        return Plan('SELECT * FROM orders WHERE amount > :amount;', {'amount': 100}, None, 'id')
+    elif 'total' in shape and ('order' in shape or 'count' in shape):
+        return Plan('SELECT COUNT(*) as total_orders FROM orders;', {}, None)
+    elif 'alice' in shape or 'customer' in shape and 'detail' in shape:
+        return Plan(
+            "SELECT c.name, c.email, o.id AS order_id, o.product, o.amount, o.date, o.status "
+            "FROM customers c JOIN orders o ON c.id = o.customer_id WHERE c.name = :name;",
+            {'name': 'Alice Johnson'}, None, 'order_id')
     else:
-        return {
-            'sql': 'SELECT * FROM customers LIMIT 5;',
-            'results': MOCK_DATABASE['customers'][:5],
-            'row_count': 5,
-            'note': 'Query interpretation: Showing sample customers'
-        }
+        return Plan('SELECT * FROM customers LIMIT 5;', {}, 'Query interpretation: Showing sample customers')
+
+
+def process_natural_language_query(query_text, limit=DEFAULT_PAGE_ROWS, cursor=None, offset=0):
+    """
+    Translate a question to SQL (through the plan cache) and open a page
+    of its results. The returned 'page' is a ResultPage still to be read;
+    a cursor from an earlier page's next_cursor resumes after that page.
+    """
+    version = db.schema_version()
+    shape, literals = question_normalizer(version).normalize(query_text)
+    plan = plan_cache.get(shape, version)
+    cached = plan is not None
+    if not cached:
+        plan = translate(shape)
+        plan_cache.put(shape, version, plan)
+    
+    params = {**plan.defaults, **literals}
+    params = {name: params[name] for name in params if f':{name}' in plan.sql}
+    fingerprint = query_fingerprint(plan.sql, params)
+    after = decode_cursor(cursor, fingerprint) if cursor and plan.key else None
+    sql = page_sql(plan.sql, plan.key, after, offset)
+    page, result_cached = open_page(
+        sql, {**params, '_after': after, '_limit': limit + 1, '_offset': offset}, limit, version)
+    result = {
+        'sql': render_sql(plan.sql, params),
+        'sql_template': plan.sql,
+        'params': params,
+        'plan_cached': cached,
+        'result_cached': result_cached,
+        'page': page
+    }
+    if plan.note:
+        result['note'] = plan.note
+    
+    def continuation():
+        """Where the next page starts, once this one has been read"""
+        if not page.has_more:
+            return {'has_more': False}
+        if plan.key:
+            return {'has_more': True, 'next_cursor': encode_cursor(fingerprint, page.last_row[plan.key])}
+        return {'has_more': True, 'next_offset': offset + page.row_count}
+    result['continuation'] = continuation
+    return result
 
 @app.route('/api/query', methods=['POST'])
 def query_database():
-    """Natural language query to database"""
+    """
+    Natural language query to database. Optional body fields:
+      limit  - rows per page (default 1000, capped at MAX_PAGE_ROWS)
+      cursor - next_cursor from the previous page, to continue after it
+      offset - rows to skip, for queries without a cursor key
+      format - "ndjson" (or Accept: application/x-ndjson) streams the page
+               as newline-delimited JSON: a {"meta"} line, one {"row"} line
+               per row as it is read, and an {"end"} line
+    A page also stops once its rows reach MAX_PAGE_BYTES of JSON.
+    """
     try:
         data = request.json
         nl_query = data.get('query', '')
         
         if not nl_query:
             return jsonify({"error": "No query provided"}), 400
+        try:
+            limit = max(1, min(int(data.get('limit', DEFAULT_PAGE_ROWS)), MAX_PAGE_ROWS))
+            offset = max(0, int(data.get('offset', 0)))
+        except (TypeError, ValueError):
+            return jsonify({"error": "limit and offset must be integers"}), 400
+        ndjson = data.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
         
-        result = process_natural_language_query(nl_query)
-        
-        return jsonify({
+        try:
+            result = process_natural_language_query(nl_query, limit, data.get('cursor'), offset)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except ReadersBusy as e:
+            return jsonify({"error": str(e)}), 503, {'Retry-After': '1'}
+        page = result['page']
+        meta = {
             "status": "success",
             "query": nl_query,
             "sql_generated": result['sql'],
-            "results": result['results'],
-            "row_count": result['row_count'],
+            "sql_template": result['sql_template'],
+            "params": result['params'],
+            "plan_cached": result['plan_cached'],
+            "result_cached": result['result_cached'],
+            "columns": page.columns,
+            "limit": limit,
             "timestamp": datetime.now().isoformat()
+        }
+        
+        if ndjson:
+            def lines():
+                yield json.dumps({"meta": meta}, default=str) + '\n'
+                for _, row_json in page:
+                    yield '{"row": ' + row_json + '}\n'
+                end = {"row_count": page.row_count, "truncated_by": page.truncated_by, **result['continuation']()}
+                yield json.dumps({"end": end}, default=str) + '\n'
+            
+            response = Response(stream_with_context(lines()), mimetype='application/x-ndjson',
+                                headers={'X-Accel-Buffering': 'no'})
+            response.call_on_close(page.close)
+            return response
+        
+        results = [row for row, _ in page]
+        return jsonify({
+            **meta,
+            "results": results,
+            "row_count": page.row_count,
+            "truncated_by": page.truncated_by,
+            **result['continuation']()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -125,10 +280,34 @@ def get_sample_queries():
 def get_schema():
     """Get database schema"""
     return jsonify({
-        "tables": {
-            "customers": ["id", "name", "email", "country", "signup_date"],
-            "orders": ["id", "customer_id", "product", "amount", "date", "status"]
-        }
+        "tables": db.schema()
+    })
+
+@app.route('/api/tables/<table>/rows', methods=['POST'])
+def insert_rows(table):
+    """
+    Append rows to a table: {"rows": [{column: value}, ...]}. Cached
+    results that read the table are invalidated.
+    """
+    try:
+        rows = (request.json or {}).get('rows')
+        if not rows or not isinstance(rows, list):
+            return jsonify({"error": "No rows provided"}), 400
+        if table not in table_names(db.schema_version()):
+            return jsonify({"error": f"Unknown table: {table}"}), 404
+        inserted = db.insert(table, rows)
+        return jsonify({"status": "success", "table": table, "inserted": inserted}), 201
+    except sqlite3.IntegrityError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Query engine cache statistics"""
+    return jsonify({
+        "plan_cache": plan_cache.stats(),
+        "result_cache": result_cache.stats()
     })
 
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+"""
+Benchmark: index-backed filters and joins in the embedded SQLite
+database vs full table scans, over a synthetic 10M-row orders table
+(1M customers in 50 countries).
+
+Each query runs twice: as the planner picks it (using the secondary
+indexes) and with the indexes disabled by NOT INDEXED, which is what
+every query cost before the indexes existed. SQLite has no hash join;
+its equivalent is a nested loop probing an index (or a transient
+automatic index it builds for the query), shown by the join rows.
+
+Run: python bench_queries.py [orders]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from database import Database
+
+COUNTRIES = ['USA', 'UK', 'Canada', 'Germany', 'France', 'Japan', 'Brazil', 'India'] + [f'Country {i}' for i in range(42)]
+PRODUCTS = ['Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Headset', 'Webcam', 'Dock', 'Cable']
+STATUSES = ['delivered', 'pending', 'shipped', 'cancelled']
+REPEAT = 5
+
+QUERIES = [
+    ('filter country', "SELECT COUNT(*) FROM customers{hint} WHERE country = 'Country 7'"),
+    ('filter amount > x', 'SELECT COUNT(*), SUM(amount) FROM orders{hint} WHERE amount > 4990'),
+    ('filter customer_id', 'SELECT COUNT(*), SUM(amount) FROM orders{hint} WHERE customer_id = 4242'),
+    ('join one country', (
+        'SELECT COUNT(*), SUM(o.amount) FROM customers c{hint} JOIN orders o{hint} ON o.customer_id = c.id '
+        "WHERE c.country = 'Country 7'")),
+    ('join top customers', (
+        'SELECT c.name, SUM(o.amount) AS total FROM orders o{hint} JOIN customers c ON c.id = o.customer_id '
+        'WHERE o.amount > 4990 GROUP BY c.id ORDER BY total DESC LIMIT 10')),
+    # Without sqlite_stat4 the planner cannot tell how selective a range
+    # is; likelihood() tells it, and it drives the join from the amount index
+    ('join top (hinted)', (
+        'SELECT c.name, SUM(o.amount) AS total FROM orders o{hint} JOIN customers c ON c.id = o.customer_id '
+        'WHERE likelihood(o.amount > 4990, 0.01) GROUP BY c.id ORDER BY total DESC LIMIT 10')),
+]
+
+
+def customers(n, rng):
+    for i in range(1, n + 1):
+        yield {'id': i, 'name': f'Customer {i}', 'email': f'customer{i}@example.com',
+               'country': rng.choice(COUNTRIES), 'signup_date': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'}
+
+
+def orders(n, n_customers, rng):
+    for i in range(1, n + 1):
+        yield {'id': i, 'customer_id': rng.randint(1, n_customers), 'product': rng.choice(PRODUCTS),
+               'amount': rng.randint(5, 5000), 'date': f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+               'status': rng.choice(STATUSES)}
+
+
+def timed(db, sql):
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        db.execute(sql)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def plan(db, sql):
+    _, rows = db.execute('EXPLAIN QUERY PLAN ' + sql)
+    return '; '.join(row[-1] for row in rows)
+
+
+if __name__ == '__main__':
+    n_orders = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    n_customers = max(n_orders // 10, 1)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        start = time.perf_counter()
+        db.load('customers', customers(n_customers, rng))
+        db.load('orders', orders(n_orders, n_customers, rng))
+        print(f"load + index build: {n_customers} customers, {n_orders} orders in {time.perf_counter() - start:.1f} s")
+        print()
+        print(f"{'query':<20} {'indexed':>10} {'scan':>12} {'speedup':>8}   plan")
+        for name, sql in QUERIES:
+            indexed = sql.format(hint='')
+            scanned = sql.format(hint=' NOT INDEXED')
+            fast, slow = timed(db, indexed), timed(db, scanned)
+            print(f"{name:<20} {fast:8.2f} ms {slow:9.2f} ms {slow / fast:7.0f}x   {plan(db, indexed)}")
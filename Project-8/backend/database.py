@@ -0,0 +1,212 @@
+import csv
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    country TEXT,
+    signup_date TEXT
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    product TEXT,
+    amount NUMERIC,
+    date TEXT,
+    status TEXT
+);
+"""
+
+# Secondary indexes, by table. Dropped before a bulk load and rebuilt after
+# it, which is much faster than maintaining them row by row. The
+# customer_id index carries amount too, so joins that sum a customer's
+# orders are answered from the index without touching the table.
+INDEXES = {
+    'customers': {
+        'idx_customers_country': 'customers (country)',
+    },
+    'orders': {
+        'idx_orders_customer_id': 'orders (customer_id, amount)',
+        'idx_orders_amount': 'orders (amount)',
+    },
+}
+
+
+class ReadersBusy(Exception):
+    """Every pooled read connection stayed in use for the whole wait"""
+
+
+class Database:
+    """
+    Embedded SQLite (WAL) database for the query assistant. Loading goes
+    through one writer connection; queries run on a pool of read-only
+    connections (opened with mode=ro and query_only), so generated SQL
+    can never modify the data and readers never block each other. A
+    streamed page holds its reader until the client has read it, so
+    borrowing one waits at most reader_timeout seconds (then ReadersBusy);
+    the short metadata lookups made on every request (schema_version,
+    distinct) use a connection of their own outside the pool.
+    Functions registered with on_write(fn) are called with a table's name
+    after each committed write to it. The writer connection is shared by
+    all threads, so every use of it holds _write_lock: otherwise two
+    writes would share one transaction, and one's rollback would undo
+    the other.
+    """
+
+    def __init__(self, path, readers=4, reader_timeout=5.0):
+        self.path = path
+        self.readers = readers
+        self.reader_timeout = reader_timeout
+        self._write_lock = threading.RLock()
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        with self._write_lock:
+            self._writer.execute('PRAGMA journal_mode=WAL')
+            self._writer.executescript(SCHEMA)
+            self._create_indexes()
+        self._write_listeners = []
+        self._pool = queue.Queue()
+        for _ in range(readers):
+            self._pool.put(self._connect_reader())
+        self._meta_lock = threading.Lock()
+        self._meta = self._connect_reader()
+
+    def on_write(self, listener):
+        self._write_listeners.append(listener)
+
+    def _written(self, table):
+        for listener in self._write_listeners:
+            listener(table)
+
+    def _connect_reader(self):
+        conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False, cached_statements=256)
+        conn.execute('PRAGMA query_only=ON')
+        conn.execute('PRAGMA busy_timeout=5000')
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read-only connection from the pool"""
+        try:
+            conn = self._pool.get(timeout=self.reader_timeout)
+        except queue.Empty:
+            raise ReadersBusy(f"All {self.readers} read connections are busy") from None
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def execute(self, sql, params=()):
+        """Run a query; returns (column names, list of row tuples)"""
+        with self.reader() as conn:
+            cursor = conn.execute(sql, params)
+            columns = [d[0] for d in cursor.description or ()]
+            return columns, cursor.fetchall()
+
+    def stream(self, sql, params=(), batch_size=256):
+        """
+        Server-side cursor: yields the column names, then rows as SQLite
+        produces them, batch_size at a time. The pooled connection is held
+        until the generator is exhausted or closed.
+        """
+        with self.reader() as conn:
+            cursor = conn.execute(sql, params)
+            try:
+                yield [d[0] for d in cursor.description or ()]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def query(self, sql, params=()):
+        """Run a query; returns its rows as dicts"""
+        columns, rows = self.execute(sql, params)
+        return [dict(zip(columns, row)) for row in rows]
+
+    def schema_version(self):
+        """Changes whenever any table or index is created, altered or dropped"""
+        with self._meta_lock:
+            return self._meta.execute('PRAGMA schema_version').fetchone()[0]
+
+    def distinct(self, table, column):
+        with self._meta_lock:
+            return [value for (value,) in self._meta.execute(
+                f'SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL')]
+
+    def columns(self, table):
+        with self._write_lock:
+            return [row[1] for row in self._writer.execute(f'PRAGMA table_info({table})')]
+
+    def schema(self):
+        """{table: [column names]}"""
+        with self._write_lock:
+            tables = self._writer.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+            return {name: self.columns(name) for (name,) in tables.fetchall()}
+
+    def is_empty(self):
+        with self._write_lock:
+            return not any(self._writer.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone() for table in INDEXES)
+
+    def _insert_sql(self, table):
+        columns = self.columns(table)
+        if not columns:
+            raise ValueError(f"Unknown table: {table}")
+        return columns, f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    def insert(self, table, rows):
+        """Append rows (dicts keyed by column name) to a table in one transaction"""
+        columns, insert = self._insert_sql(table)
+        with self._write_lock:
+            try:
+                with self._writer:
+                    count = self._writer.executemany(insert, [tuple(row.get(c) for c in columns) for row in rows]).rowcount
+            finally:
+                self._written(table)
+        return count
+
+    def load(self, table, rows):
+        """
+        Replace a table's contents with rows (dicts keyed by column name,
+        e.g. MOCK_DATABASE entries or csv.DictReader rows), in one
+        transaction. Keys that are not columns are ignored.
+        """
+        columns, insert = self._insert_sql(table)
+        with self._write_lock:
+            try:
+                with self._writer:
+                    self._drop_indexes(table)
+                    self._writer.execute(f'DELETE FROM {table}')
+                    self._writer.executemany(insert, (tuple(row.get(c) for c in columns) for row in rows))
+                    self._create_indexes(table)
+            finally:
+                self._written(table)
+            self._writer.execute('ANALYZE')
+            return self._writer.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def load_csv(self, table, path):
+        """Replace a table's contents with a CSV file that has a header row"""
+        with open(path, newline='', encoding='utf-8') as f:
+            return self.load(table, (
+                {column: value if value != '' else None for column, value in row.items()}
+                for row in csv.DictReader(f)
+            ))
+
+    # Call with _write_lock held
+
+    def _drop_indexes(self, table):
+        for name in INDEXES.get(table, ()):
+            self._writer.execute(f'DROP INDEX IF EXISTS {name}')
+
+    def _create_indexes(self, table=None):
+        tables = [table] if table else list(INDEXES)
+        for t in tables:
+            for name, target in INDEXES.get(t, {}).items():
+                self._writer.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
@@ -0,0 +1,99 @@
+import base64
+import hashlib
+import json
+
+
+def query_fingerprint(sql, params):
+    """Short hash tying a continuation token to the query it came from"""
+    raw = sql + '|' + json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def encode_cursor(fingerprint, key):
+    """Opaque continuation token: resume after the row whose key column is `key`"""
+    raw = json.dumps([fingerprint, key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fingerprint):
+    """The key a token resumes after; ValueError if it is malformed or belongs to another query"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        token_fingerprint, key = json.loads(base64.urlsafe_b64decode(padded))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if token_fingerprint != fingerprint:
+        raise ValueError("Cursor belongs to a different query")
+    return key
+
+
+def page_sql(sql, key=None, after=None, offset=0):
+    """
+    Wrap a query to read one page, limited by :_limit. With a key column
+    rows come in key order, resuming after :_after (keyset pagination:
+    every page costs the same, however deep); without one, :_offset rows
+    are skipped.
+    """
+    inner = sql.strip().rstrip(';')
+    if key is not None:
+        where = f' WHERE {key} > :_after' if after is not None else ''
+        return f'SELECT * FROM ({inner}){where} ORDER BY {key} LIMIT :_limit'
+    if offset:
+        return f'SELECT * FROM ({inner}) LIMIT :_limit OFFSET :_offset'
+    return f'SELECT * FROM ({inner}) LIMIT :_limit'
+
+
+class ResultPage:
+    """
+    One page of rows read lazily from a server-side cursor (an iterator
+    yielding the column names, then row tuples) and cut off at `limit`
+    rows or `max_bytes` of JSON, whichever comes first. Iterating yields
+    (row dict, its JSON); afterwards row_count, has_more, truncated_by and
+    last_row describe the page. Reading one row past the limit tells
+    whether more rows exist.
+
+    With on_complete, every row tuple read from the cursor is also kept
+    in `fetched`, and on_complete(page) is called once the page has been
+    read to its end (not if the reader stops early), e.g. to cache it.
+    """
+
+    def __init__(self, rows, limit, max_bytes, on_complete=None):
+        self._rows = rows
+        self.on_complete = on_complete
+        self.fetched = [] if on_complete else None
+        self.columns = next(rows)
+        self.limit = limit
+        self.max_bytes = max_bytes
+        self.row_count = 0
+        self.bytes = 0
+        self.has_more = False
+        self.truncated_by = None
+        self.last_row = None
+
+    def __iter__(self):
+        try:
+            for row in self._rows:
+                if self.fetched is not None:
+                    self.fetched.append(row)
+                if self.row_count == self.limit:
+                    self.has_more = True
+                    self.truncated_by = 'rows'
+                    break
+                record = dict(zip(self.columns, row))
+                line = json.dumps(record, default=str)
+                if self.row_count and self.bytes + len(line) > self.max_bytes:
+                    self.has_more = True
+                    self.truncated_by = 'bytes'
+                    break
+                self.row_count += 1
+                self.bytes += len(line)
+                self.last_row = record
+                yield record, line
+            if self.on_complete:
+                self.on_complete(self)
+        finally:
+            self.close()
+
+    def close(self):
+        """Finish with the cursor and hand its connection back to the pool"""
+        self._rows.close()
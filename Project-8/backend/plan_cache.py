@@ -0,0 +1,122 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, namedtuple
+
+_NUMBER = re.compile(r'\$?\s*(\d[\d,]*(?:\.\d+)?)\s*(k\b)?')
+_PUNCTUATION = re.compile(r"[^\w\s<>]")
+_WHITESPACE = re.compile(r'\s+')
+_PARAMETER = re.compile(r':(\w+)')
+
+# SQL template with :named parameters, defaults for parameters the
+# question may leave out, an optional note for the user, and the unique
+# result column that pages are ordered and resumed by (None: no keyset)
+Plan = namedtuple('Plan', 'sql defaults note key', defaults=(None,))
+
+
+class QuestionNormalizer:
+    """
+    Splits a question into its shape and its literals: "Orders over $500"
+    and "orders over 1,200" both become "orders over <amount>", with
+    {'amount': 500} and {'amount': 1200}. Numbers bind to "amount"; the
+    phrases in vocabulary ({parameter: {phrase: value}}, e.g. the known
+    countries) bind to their parameter.
+    """
+
+    def __init__(self, vocabulary):
+        self._phrases = []
+        for name, phrases in vocabulary.items():
+            mapping = {self._fold(phrase): value for phrase, value in phrases.items()}
+            if not mapping:
+                continue
+            alternatives = '|'.join(re.escape(p) for p in sorted(mapping, key=len, reverse=True))
+            self._phrases.append((name, re.compile(rf'\b(?:{alternatives})\b'), mapping))
+
+    @staticmethod
+    def _fold(text):
+        return unicodedata.normalize('NFKC', text).casefold()
+
+    def normalize(self, question):
+        """(shape, {parameter: value})"""
+        text = self._fold(question)
+        literals = {}
+        for name, pattern, mapping in self._phrases:
+            def bind(match, name=name, mapping=mapping):
+                literals.setdefault(name, mapping[match.group(0)])
+                return f' <{name}> '
+            text = pattern.sub(bind, text)
+
+        def bind_number(match):
+            value = float(match.group(1).replace(',', '')) * (1000 if match.group(2) else 1)
+            literals.setdefault('amount', int(value) if value.is_integer() else value)
+            return ' <amount> '
+        text = _NUMBER.sub(bind_number, text)
+        text = _PUNCTUATION.sub(' ', text)
+        return _WHITESPACE.sub(' ', text).strip(), literals
+
+
+def render_sql(sql, params):
+    """A template with its parameters inlined as SQL literals, for display"""
+    def literal(match):
+        value = params.get(match.group(1))
+        if isinstance(value, (int, float)):
+            return repr(value)
+        return "'" + str(value).replace("'", "''") + "'"
+    return _PARAMETER.sub(literal, sql)
+
+
+class PlanCache:
+    """
+    LRU cache from question shape to translated Plan. Entries belong to a
+    schema version: the first lookup under a different version empties
+    the cache, since old plans may name tables or columns that changed.
+    Plans keep the same SQL text for every literal, so each pooled
+    connection's statement cache also reuses the prepared statement.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {shape: Plan}
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, shape, version):
+        with self._lock:
+            self._check_version(version)
+            plan = self._entries.get(shape)
+            if plan is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(shape)
+            self.hits += 1
+            return plan
+
+    def put(self, shape, version, plan):
+        with self._lock:
+            self._check_version(version)
+            self._entries[shape] = plan
+            self._entries.move_to_end(shape)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'schema_version': self._version
+            }
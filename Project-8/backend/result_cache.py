@@ -0,0 +1,126 @@
+import json
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+_WHITESPACE = re.compile(r'\s+')
+_WORD = re.compile(r'\w+')
+
+# A cached page: column names, the row tuples read from the cursor, and
+# its size in bytes of JSON
+CachedResult = namedtuple('CachedResult', 'columns rows size')
+
+
+def replay(result):
+    """A cached result as a cursor again: the column names, then the rows"""
+    yield result.columns
+    yield from result.rows
+
+
+def normalize_sql(sql):
+    return _WHITESPACE.sub(' ', sql).strip().rstrip(';').strip()
+
+
+def tables_in(sql, tables):
+    """Names from `tables` that a query mentions (a superset of the tables it reads)"""
+    return frozenset(word for word in _WORD.findall(sql.lower()) if word in tables)
+
+
+class ResultCache:
+    """
+    LRU cache of query results keyed by normalized SQL text plus bound
+    parameters, bounded by the total size of the cached rows. Each entry
+    is tagged with the tables its query reads; a write to a table drops
+    exactly the entries tagged with it. Every table also has a write
+    generation: a result is only stored if none of its tables was
+    written while the query ran, so a slow read never caches stale rows.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entry_bytes=None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 8
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {key: (CachedResult, tables)}
+        self._by_table = {}            # {table: set of keys}
+        self._generations = {}         # {table: writes seen}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(sql, params):
+        return normalize_sql(sql) + '\x00' + json.dumps(params, sort_keys=True, default=str)
+
+    def get(self, sql, params):
+        key = self.key(sql, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += entry[0].size
+            return entry[0]
+
+    def generation(self, tables):
+        """Snapshot of the tables' write generations, to pass to put()"""
+        with self._lock:
+            return tuple(self._generations.get(table, 0) for table in sorted(tables))
+
+    def put(self, sql, params, tables, generation, result):
+        """Store a result read under `generation` (from generation(tables) before the query ran)"""
+        if result.size > self.max_entry_bytes:
+            return False
+        key = self.key(sql, params)
+        with self._lock:
+            if generation != tuple(self._generations.get(table, 0) for table in sorted(tables)):
+                return False  # written meanwhile: the rows may predate the write
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, tables)
+            self.bytes += result.size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, table):
+        """A table was written: drop every result that read it"""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            keys = self._by_table.pop(table, ())
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _remove(self, key):
+        result, tables = self._entries.pop(key)
+        self.bytes -= result.size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -53,12 +53,16 @@ async function sendQuery() {
     
     displayMessage(query, 'user');
     userInput.value = '';
-    
+    await runQuery(query, {});
+}
+
+// page: {} for the first page, {cursor} or {offset} from the previous one
+async function runQuery(query, page) {
     try {
         const response = await fetch(`${API_URL}/query`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ query: query })
+            body: JSON.stringify({ query: query, ...page })
         });
         
         const data = await response.json();
@@ -79,7 +83,7 @@ function displayQueryResult(data) {
     resultDiv.className = 'message bot-message';
     
     let html = '<strong>Query Result:</strong>';
-    html += `<div class="sql-display">SQL: ${data.sql_generated}</div>`;
+    html += `<div class="sql-display">SQL: ${data.sql_generated}${data.plan_cached ? ' <em>(cached plan)</em>' : ''}</div>`;
     
     // Display results as table
     if (Array.isArray(data.results) && data.results.length > 0) {
@@ -102,9 +106,20 @@ function displayQueryResult(data) {
         html += '</table>';
     }
     
-    html += `<div class="row-count">✓ Returned ${data.row_count} row(s)</div>`;
+    html += `<div class="row-count">✓ Returned ${data.row_count} row(s)${data.has_more ? ' (more available)' : ''}</div>`;
     
     resultDiv.innerHTML = html;
+    if (data.has_more) {
+        const nextPage = data.next_cursor ? { cursor: data.next_cursor } : { offset: data.next_offset };
+        const moreButton = document.createElement('button');
+        moreButton.className = 'load-more';
+        moreButton.textContent = 'Load more';
+        moreButton.onclick = () => {
+            moreButton.remove();
+            runQuery(data.query, nextPage);
+        };
+        resultDiv.appendChild(moreButton);
+    }
     messagesDiv.appendChild(resultDiv);
     messagesDiv.scrollTop = messagesDiv.scrollHeight;
 }
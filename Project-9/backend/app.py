@@ -2,6 +2,8 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import json
 
+from columnar import Sheet
+
 app = Flask(__name__)
 CORS(app)
 
@@ -30,39 +32,43 @@ SPREADSHEET_DATA = {
     }
 }
 
+# Sheets held column by column (typed NumPy arrays, dictionary-encoded
+# text), built from the mock data
+SHEETS = {name: Sheet.from_rows(data['headers'], data['rows']) for name, data in SPREADSHEET_DATA.items()}
+
 def query_sheet(sheet_name, query_text):
     """Process natural language queries on spreadsheet data"""
-    if sheet_name not in SPREADSHEET_DATA:
+    if sheet_name not in SHEETS:
         return None
     
-    sheet = SPREADSHEET_DATA[sheet_name]
+    sheet = SHEETS[sheet_name]
     query_lower = query_text.lower()
     
     if sheet_name == 'Sales':
         if 'north' in query_lower:
-            filtered = [row for row in sheet['rows'] if row[4] == 'North']
+            filtered = sheet.rows(sheet.equals('Region', 'North'))
             return {'filtered_data': filtered, 'description': f'Found {len(filtered)} north region sales'}
         elif 'total revenue' in query_lower or 'sum revenue' in query_lower:
-            total = sum(row[3] for row in sheet['rows'])
+            total = sheet.sum('Revenue')
             return {'result': total, 'description': f'Total revenue: ${total:,}'}
         elif 'laptop' in query_lower:
-            filtered = [row for row in sheet['rows'] if row[1] == 'Laptop']
+            filtered = sheet.rows(sheet.equals('Product', 'Laptop'))
             return {'filtered_data': filtered, 'description': f'Found {len(filtered)} laptop sales'}
         else:
-            return {'all_data': sheet['rows'], 'description': 'Showing all sales data'}
+            return {'all_data': sheet.rows(), 'description': 'Showing all sales data'}
     
     elif sheet_name == 'Employees':
         if 'engineering' in query_lower:
-            filtered = [row for row in sheet['rows'] if row[1] == 'Engineering']
+            filtered = sheet.rows(sheet.equals('Department', 'Engineering'))
             return {'filtered_data': filtered, 'description': f'Found {len(filtered)} engineering employees'}
         elif 'salary' in query_lower and 'over' in query_lower:
-            filtered = [row for row in sheet['rows'] if row[2] > 100000]
+            filtered = sheet.rows(sheet.greater('Salary', 100000))
             return {'filtered_data': filtered, 'description': f'Employees with salary > $100k'}
         elif 'highest' in query_lower and 'salary' in query_lower:
-            highest = max(sheet['rows'], key=lambda x: x[2])
+            highest = sheet.row(sheet.argmax('Salary'))
             return {'result': highest, 'description': f'Highest salary: {highest[0]} - ${highest[2]:,}'}
         else:
-            return {'all_data': sheet['rows'], 'description': 'Showing all employees'}
+            return {'all_data': sheet.rows(), 'description': 'Showing all employees'}
     
     return None
 
@@ -79,15 +85,15 @@ def list_sheets():
 @app.route('/api/sheet/<sheet_name>', methods=['GET'])
 def get_sheet(sheet_name):
     """Get sheet data"""
-    if sheet_name not in SPREADSHEET_DATA:
+    if sheet_name not in SHEETS:
         return jsonify({"error": "Sheet not found"}), 404
     
-    sheet = SPREADSHEET_DATA[sheet_name]
+    sheet = SHEETS[sheet_name]
     return jsonify({
         "name": sheet_name,
-        "headers": sheet['headers'],
-        "rows": sheet['rows'],
-        "row_count": len(sheet['rows'])
+        "headers": sheet.headers,
+        "rows": sheet.rows(),
+        "row_count": len(sheet)
     })
 
 @app.route('/api/query-sheet', methods=['POST'])
@@ -106,13 +112,11 @@ def query():
         if result is None:
             return jsonify({"error": "Sheet not found"}), 404
         
-        sheet = SPREADSHEET_DATA[sheet_name]
-        
         return jsonify({
             "status": "success",
             "sheet": sheet_name,
             "query": query_text,
-            "headers": sheet['headers'],
+            "headers": SHEETS[sheet_name].headers,
             "result": result,
             "sample_queries": [
                 "Show north region sales",
@@ -0,0 +1,76 @@
+"""
+Benchmark: vectorized queries on a columnar Sheet vs the previous row
+loops over lists, on a synthetic 5M-row Sales sheet.
+
+Run: python bench_sheets.py [rows]
+"""
+import sys
+import time
+
+import numpy as np
+
+from columnar import DictionaryColumn, Sheet
+
+HEADERS = ['Month', 'Product', 'Quantity', 'Revenue', 'Region']
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December']
+PRODUCTS = ['Laptop', 'Phone', 'Tablet', 'Monitor', 'Keyboard', 'Mouse', 'Headset', 'Dock']
+REGIONS = ['North', 'South', 'East', 'West']
+REPEAT = 3
+
+
+def make_data(n, rng):
+    return {
+        'Month': np.array(MONTHS, dtype=object)[rng.integers(0, len(MONTHS), n)],
+        'Product': np.array(PRODUCTS, dtype=object)[rng.integers(0, len(PRODUCTS), n)],
+        'Quantity': rng.integers(1, 500, n),
+        'Revenue': rng.integers(100, 500_000, n),
+        'Region': np.array(REGIONS, dtype=object)[rng.integers(0, len(REGIONS), n)],
+    }
+
+
+def timed(fn):
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    data = make_data(n, np.random.default_rng(0))
+
+    start = time.perf_counter()
+    rows = [list(row) for row in zip(*(data[h].tolist() for h in HEADERS))]
+    print(f"row lists built in     {time.perf_counter() - start:6.1f} s")
+    start = time.perf_counter()
+    sheet = Sheet.from_columns(HEADERS, {h: DictionaryColumn.encode(v) if v.dtype == object else v
+                                         for h, v in data.items()})
+    print(f"columnar sheet built in {time.perf_counter() - start:5.1f} s")
+    print()
+
+    cases = [
+        ('filter Region == North (count)',
+         lambda: len([row for row in rows if row[4] == 'North']),
+         lambda: sheet.count(sheet.equals('Region', 'North'))),
+        ('filter Revenue > 100000 (count)',
+         lambda: len([row for row in rows if row[3] > 100000]),
+         lambda: sheet.count(sheet.greater('Revenue', 100000))),
+        ('sum Revenue',
+         lambda: sum(row[3] for row in rows),
+         lambda: sheet.sum('Revenue')),
+        ('sum Revenue, North laptops',
+         lambda: sum(row[3] for row in rows if row[4] == 'North' and row[1] == 'Laptop'),
+         lambda: sheet.sum('Revenue', sheet.equals('Region', 'North') & sheet.equals('Product', 'Laptop'))),
+        ('max Revenue (row)',
+         lambda: max(rows, key=lambda row: row[3]),
+         lambda: sheet.row(sheet.argmax('Revenue'))),
+    ]
+    print(f"{'operation':<34} {'row loop':>11} {'columnar':>11} {'speedup':>8}")
+    for name, loop, vectorized in cases:
+        slow, expected = timed(loop)
+        fast, result = timed(vectorized)
+        assert result == expected, (name, result, expected)
+        print(f"{name:<34} {slow:8.1f} ms {fast:8.2f} ms {slow / fast:7.0f}x")
@@ -0,0 +1,165 @@
+import numbers
+
+import numpy as np
+
+
+def _smallest_int(lo, hi, candidates=(np.int8, np.int16, np.int32, np.int64)):
+    for dtype in candidates:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+
+def _narrow(values):
+    """An integer array in the narrowest type that holds its values"""
+    return values.astype(_smallest_int(values.min(), values.max())) if len(values) else values
+
+
+class DictionaryColumn:
+    """
+    String column stored as small integer codes (uint8 for up to 256
+    distinct values) into a sorted array of its distinct values, so
+    comparisons against a value are one narrow integer compare per row.
+    """
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = values  # object array of distinct strings, sorted
+
+    @classmethod
+    def encode(cls, strings):
+        seen = {}
+        codes = np.fromiter((seen.setdefault(s, len(seen)) for s in strings), dtype=np.int64, count=len(strings))
+        values = np.empty(len(seen), dtype=object)
+        values[:] = list(seen)
+        order = np.argsort(values)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        dtype = _smallest_int(0, max(len(values) - 1, 0), (np.uint8, np.uint16, np.uint32))
+        return cls(rank[codes].astype(dtype), values[order])
+
+    def code(self, value):
+        """Code of a value, or None if no row holds it"""
+        i = int(np.searchsorted(self.values, value))
+        return i if i < len(self.values) and self.values[i] == value else None
+
+    def equals(self, value):
+        code = self.code(value)
+        if code is None:
+            return np.zeros(len(self.codes), dtype=bool)
+        return self.codes == code
+
+    def take(self, idx):
+        return self.values[self.codes[idx]]
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class Sheet:
+    """
+    A spreadsheet held column by column and addressed by header name:
+    numeric columns are arrays of the narrowest integer type that holds
+    them (or float64), text columns are dictionary-encoded. Filters build
+    boolean masks over whole columns, and aggregates run over the masked
+    arrays, so no per-row Python code runs until selected rows are turned
+    back into lists.
+    """
+
+    def __init__(self, headers, columns):
+        self.headers = list(headers)
+        self.columns = columns  # {header: ndarray or DictionaryColumn}
+        self._rows = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_rows(cls, headers, rows):
+        return cls.from_columns(headers, {h: [row[i] for row in rows] for i, h in enumerate(headers)})
+
+    @classmethod
+    def from_columns(cls, headers, data):
+        """Build from {header: sequence}; each column's type is inferred from its values"""
+        columns = {}
+        for header in headers:
+            values = data[header]
+            if isinstance(values, DictionaryColumn):
+                columns[header] = values
+            elif isinstance(values, np.ndarray) and values.dtype.kind == 'i':
+                columns[header] = _narrow(values)
+            elif isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+                columns[header] = values
+            elif all(isinstance(v, numbers.Integral) and not isinstance(v, bool) for v in values):
+                columns[header] = _narrow(np.asarray(values, dtype=np.int64))
+            elif all(isinstance(v, numbers.Real) and not isinstance(v, bool) for v in values):
+                columns[header] = np.asarray(values, dtype=np.float64)
+            else:
+                columns[header] = DictionaryColumn.encode([str(v) for v in values])
+        return cls(headers, columns)
+
+    def __len__(self):
+        return self._rows
+
+    def column(self, header):
+        try:
+            return self.columns[header]
+        except KeyError:
+            raise KeyError(f"No column {header!r}") from None
+
+    def numeric(self, header):
+        column = self.column(header)
+        if isinstance(column, DictionaryColumn):
+            raise TypeError(f"Column {header!r} is not numeric")
+        return column
+
+    # Filters: boolean masks, combined with & and |
+
+    def equals(self, header, value):
+        column = self.column(header)
+        if isinstance(column, DictionaryColumn):
+            return column.equals(value)
+        return column == value
+
+    def greater(self, header, value):
+        return self.numeric(header) > value
+
+    def less(self, header, value):
+        return self.numeric(header) < value
+
+    # Aggregates over all rows, or the rows a mask selects
+
+    def sum(self, header, mask=None):
+        values = self.numeric(header)
+        if mask is not None:
+            values = values[mask]
+        # Narrow integer columns still add up in 64 bits
+        return values.sum(dtype=np.int64 if values.dtype.kind == 'i' else np.float64).item()
+
+    def argmax(self, header, mask=None):
+        """Index of the (first) row with the largest value, or None if no row is selected"""
+        values = self.numeric(header)
+        if mask is None:
+            return int(values.argmax()) if len(values) else None
+        idx = np.flatnonzero(mask)
+        return int(idx[values[idx].argmax()]) if len(idx) else None
+
+    def count(self, mask=None):
+        return len(self) if mask is None else int(np.count_nonzero(mask))
+
+    # Back to row lists
+
+    def rows(self, mask=None, limit=None):
+        """Selected rows as lists of Python values, in sheet order"""
+        idx = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if limit is not None:
+            idx = idx[:limit]
+        columns = [self._take(header, idx) for header in self.headers]
+        return [list(row) for row in zip(*columns)]
+
+    def row(self, i):
+        return [self._take(header, [i])[0] for header in self.headers]
+
+    def _take(self, header, idx):
+        column = self.columns[header]
+        if isinstance(column, DictionaryColumn):
+            return column.take(idx).tolist()
+        return column[idx].tolist()